@@ -0,0 +1,69 @@
+"""Benchmark suite for little-api.
+
+    python -m benchmarks run --quick --output results.json
+    python -m benchmarks compare baseline.json results.json --threshold 0.1
+
+`compare` exits with status 1 when a benchmark got slower than the threshold.
+"""
+
+import argparse
+import json
+import sys
+
+from benchmarks import bench_app, bench_orm
+from benchmarks.runner import compare, run
+
+
+def run_command(args) -> int:
+    suite = bench_app.benchmarks(args.quick) + bench_orm.benchmarks(args.quick)
+    results = run(
+        suite, time_scale=0.25 if args.quick else 1.0, name_filter=args.filter
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+def compare_command(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold, args.metric)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['name']:<45} {row['baseline']:>12.1f} {row['current']:>12.1f}"
+            f" {row['change']:>+8.1%} {flag}"
+        )
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument(
+        "--quick", action="store_true", help="smaller sizes and shorter runs"
+    )
+    run_parser.add_argument("--filter", help="only run benchmarks containing this")
+    run_parser.add_argument("--output", help="write results as JSON to this file")
+    run_parser.set_defaults(func=run_command)
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=0.1, help="allowed slowdown, 0.1 is 10%%"
+    )
+    compare_parser.add_argument("--metric", default="p50_us")
+    compare_parser.set_defaults(func=compare_command)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
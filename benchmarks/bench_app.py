@@ -0,0 +1,128 @@
+import atexit
+import io
+import os
+import shutil
+import tempfile
+from typing import Callable, List
+
+from benchmarks.runner import Benchmark
+from little_api.api import API
+from little_api.middleware import Middleware
+from little_api.testing import TestClient
+
+ROUTE_COUNTS = [10, 100, 1000]
+MIDDLEWARE_DEPTHS = [0, 1, 2, 4, 8, 16]
+JSON_SIZES = [100, 10_000, 1_000_000, 10_000_000]
+QUICK_JSON_SIZES = [100, 10_000, 1_000_000]
+
+
+def _start_response(status, headers, exc_info=None):
+    pass
+
+
+def temp_dir() -> str:
+    path = tempfile.mkdtemp(prefix="little-api-bench-")
+    atexit.register(shutil.rmtree, path, True)
+    return path
+
+
+def wsgi_request(app: Callable, path: str) -> Callable[[], int]:
+    """Function calling the WSGI app directly with a GET for `path`,
+    consuming and closing the response like a server would"""
+    environ = TestClient(app).build_environ("GET", path)
+
+    def call() -> int:
+        request_environ = dict(environ)
+        request_environ["wsgi.input"] = io.BytesIO()
+        app_iter = app(request_environ, _start_response)
+        try:
+            return sum(len(chunk) for chunk in app_iter)
+        finally:
+            close = getattr(app_iter, "close", None)
+            if close is not None:
+                close()
+
+    return call
+
+
+def routing(routes: int) -> Callable:
+    def setup():
+        api = API()
+        for idx in range(routes):
+            api.add_route(f"/route{idx}/{{item_id:d}}", lambda req, resp, item_id: None)
+        last = f"/route{routes - 1}/42"
+        return lambda: api.find_handler(last)
+
+    return setup
+
+
+def middleware(depth: int) -> Callable:
+    def setup():
+        api = API()
+
+        @api.route("/")
+        def home(req, resp):
+            resp.text = "ok"
+
+        for _ in range(depth):
+            api.add_middleware(Middleware)
+        return wsgi_request(api, "/")
+
+    return setup
+
+
+def json_response(size: int) -> Callable:
+    def setup():
+        api = API()
+        # strings of ~100 encoded bytes each
+        payload = ["x" * 96] * max(1, size // 100)
+
+        @api.route("/json")
+        def data(req, resp):
+            resp.json = payload
+
+        return wsgi_request(api, "/json")
+
+    return setup
+
+
+def template_render() -> Callable:
+    def setup():
+        templates = temp_dir()
+        with open(os.path.join(templates, "list.html"), "w") as f:
+            f.write(
+                "<h1>{{ title }}</h1><ul>"
+                "{% for item in items %}<li>{{ item.name }}: {{ item.value }}</li>"
+                "{% endfor %}</ul>"
+            )
+        api = API(templates_dir=templates)
+        context = {
+            "title": "Items",
+            "items": [{"name": f"item {i}", "value": i} for i in range(100)],
+        }
+        return lambda: api.template("list.html", context)
+
+    return setup
+
+
+def static_file(size: int = 16 * 1024) -> Callable:
+    def setup():
+        static = temp_dir()
+        with open(os.path.join(static, "bench.css"), "wb") as f:
+            f.write(b"a" * size)
+        api = API(static_dir=static)
+        return wsgi_request(api, "/static/bench.css")
+
+    return setup
+
+
+def benchmarks(quick: bool = False) -> List[Benchmark]:
+    suite = [Benchmark(f"routing/{n}", routing(n)) for n in ROUTE_COUNTS]
+    suite += [Benchmark(f"middleware/{d}", middleware(d)) for d in MIDDLEWARE_DEPTHS]
+    suite += [
+        Benchmark(f"json/{size}", json_response(size), min_iterations=5)
+        for size in (QUICK_JSON_SIZES if quick else JSON_SIZES)
+    ]
+    suite.append(Benchmark("template/100_items", template_render()))
+    suite.append(Benchmark("static/16k", static_file()))
+    return suite
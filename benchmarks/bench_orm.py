@@ -0,0 +1,113 @@
+import itertools
+from typing import Callable, List
+
+from benchmarks.runner import Benchmark
+from little_api.orm import Column, Database, ForeignKey, Table
+
+ROW_COUNTS = [1_000, 10_000, 100_000, 1_000_000]
+QUICK_ROW_COUNTS = [1_000, 10_000]
+
+
+class BenchAuthor(Table):
+    name = Column(str)
+    age = Column(int)
+
+
+class BenchBook(Table):
+    title = Column(str)
+    pages = Column(int)
+    author = ForeignKey(BenchAuthor)
+
+
+def populate(rows: int, foreign_keys: bool) -> Database:
+    db = Database(":memory:")
+    db.create(BenchAuthor)
+    db.create(BenchBook)
+    authors = [
+        BenchAuthor(name=f"author {i}", age=i % 90)
+        for i in range(max(1, rows // 10) if foreign_keys else rows)
+    ]
+    db.save_many(authors)
+    if foreign_keys:
+        db.save_many(
+            BenchBook(
+                title=f"book {i}", pages=i % 500, author=authors[i % len(authors)]
+            )
+            for i in range(rows)
+        )
+    return db
+
+
+def table_for(foreign_keys: bool):
+    return BenchBook if foreign_keys else BenchAuthor
+
+
+def save_many(rows: int, foreign_keys: bool) -> Callable:
+    def setup():
+        author = BenchAuthor(name="author", age=1)
+
+        def call():
+            db = Database(":memory:")
+            db.create(BenchAuthor)
+            db.create(BenchBook)
+            if foreign_keys:
+                db.save(author)
+                db.save_many(
+                    BenchBook(title=f"book {i}", pages=i, author=author)
+                    for i in range(rows)
+                )
+            else:
+                db.save_many(BenchAuthor(name=f"a {i}", age=i) for i in range(rows))
+            db.close()
+
+        return call
+
+    return setup
+
+
+def save(rows: int, foreign_keys: bool) -> Callable:
+    """One `Database.save` per call into a table of `rows` rows"""
+
+    def setup():
+        db = populate(rows, foreign_keys)
+        if foreign_keys:
+            [author] = db.get(BenchAuthor, id=1)
+            return lambda: db.save(BenchBook(title="book", pages=1, author=author))
+        return lambda: db.save(BenchAuthor(name="author", age=1))
+
+    return setup
+
+
+def get(rows: int, foreign_keys: bool) -> Callable:
+    def setup():
+        db = populate(rows, foreign_keys)
+        table = table_for(foreign_keys)
+        ids = itertools.cycle(range(1, rows + 1, max(1, rows // 997)))
+        return lambda: db.get(table, id=next(ids))
+
+    return setup
+
+
+def all_rows(rows: int, foreign_keys: bool) -> Callable:
+    def setup():
+        db = populate(rows, foreign_keys)
+        table = table_for(foreign_keys)
+        return lambda: db.all(table)
+
+    return setup
+
+
+def benchmarks(quick: bool = False) -> List[Benchmark]:
+    suite = []
+    for rows in QUICK_ROW_COUNTS if quick else ROW_COUNTS:
+        for foreign_keys in (False, True):
+            kind = "fk" if foreign_keys else "plain"
+            suite += [
+                Benchmark(
+                    f"orm/save_many/{kind}/{rows}", save_many(rows, foreign_keys)
+                ),
+                Benchmark(f"orm/save/{kind}/{rows}", save(rows, foreign_keys)),
+                Benchmark(f"orm/get/{kind}/{rows}", get(rows, foreign_keys)),
+                Benchmark(f"orm/all/{kind}/{rows}", all_rows(rows, foreign_keys)),
+            ]
+    return suite
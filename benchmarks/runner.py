@@ -0,0 +1,121 @@
+import gc
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+
+class Benchmark:
+    """A named workload, `setup` runs once and returns the function timed"""
+
+    def __init__(
+        self,
+        name: str,
+        setup: Callable[[], Callable[[], object]],
+        min_time: float = 0.2,
+        max_iterations: int = 100_000,
+        min_iterations: int = 3,
+    ):
+        self.name = name
+        self.setup = setup
+        self.min_time = min_time
+        self.max_iterations = max_iterations
+        self.min_iterations = min_iterations
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    idx = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def measure(benchmark: Benchmark, time_scale: float = 1.0) -> Dict:
+    """Runs a benchmark until `min_time` has passed, returning throughput,
+    latency percentiles in microseconds and traced allocations of one call"""
+    func = benchmark.setup()
+    func()  # warm up caches, lazy imports and compiled routes
+    min_time = benchmark.min_time * time_scale
+    timings: List[float] = []
+    gc.collect()
+    started = time.perf_counter()
+    while len(timings) < benchmark.max_iterations and (
+        len(timings) < benchmark.min_iterations
+        or time.perf_counter() - started < min_time
+    ):
+        call_started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - call_started)
+    total = sum(timings)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "iterations": len(timings),
+        "ops_per_sec": len(timings) / total if total else 0.0,
+        "mean_us": statistics.fmean(timings) * 1e6,
+        "p50_us": percentile(timings, 0.50) * 1e6,
+        "p90_us": percentile(timings, 0.90) * 1e6,
+        "p99_us": percentile(timings, 0.99) * 1e6,
+        "alloc_peak_bytes": peak - before,
+        "alloc_retained_bytes": after - before,
+    }
+
+
+def run(
+    benchmarks: List[Benchmark],
+    time_scale: float = 1.0,
+    name_filter: Optional[str] = None,
+    report: Callable[[str], None] = print,
+) -> Dict:
+    """Measures each benchmark, returning results ready to dump as JSON"""
+    results = {}
+    for benchmark in benchmarks:
+        if name_filter and name_filter not in benchmark.name:
+            continue
+        result = results[benchmark.name] = measure(benchmark, time_scale)
+        report(
+            f"{benchmark.name:<45} {result['ops_per_sec']:>12.1f} ops/s"
+            f"  p50 {result['p50_us']:>10.1f}us  p99 {result['p99_us']:>10.1f}us"
+            f"  alloc {result['alloc_peak_bytes']:>10}B"
+        )
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "time": time.time(),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: Dict, current: Dict, threshold: float = 0.1, metric: str = "p50_us"
+) -> List[Dict]:
+    """Benchmarks present in both runs with how much slower `current` is,
+    `regression` is set when it is slower by more than `threshold`"""
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None or not base[metric]:
+            continue
+        change = result[metric] / base[metric] - 1
+        rows.append(
+            {
+                "name": name,
+                "baseline": base[metric],
+                "current": result[metric],
+                "change": change,
+                "regression": change > threshold,
+            }
+        )
+    return rows
@@ -1,5 +1,5 @@
 #!/bin/sh
 set -e
 
-gunicorn example_app:app --daemon
+python -m little_api.server serve example_app:app --preload --daemon
 curl localhost:8000/info
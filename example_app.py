@@ -1,26 +1,40 @@
+import sqlite3
 from datetime import datetime
 
-from webob import Request
-
 from little_api.api import API
 from little_api.auth import check_password, generate_password_hash
-from little_api.orm import Column, Database, Table
+from little_api.cache import SQLiteCache
+from little_api.orm import Column, Database, QueryCache, Table
+from little_api.request import Request
 
 app = API()
-db = Database("example_app.sqlite")
+# query results are cached in a file shared by all the server's workers
+cache_store = SQLiteCache("example_app.cache", ttl=60, max_entries=10_000)
+db = Database("example_app.sqlite", cache=QueryCache(shared=True, store=cache_store))
 
 
 class User(Table):
-    user_name = Column(str)
+    user_name = Column(str, unique=True)
     password = Column(str)
     created_at = Column(datetime)
 
 
+# the keys user_detail has always returned, without the password hash
+UserSerializer = User.serializer(
+    fields=["user_name", "created_at"], rename={"created_at": "create_id"}
+)
+
+
 def enable_jwt(api: API) -> None:
     def validate_user(request: Request):
-        user = db.get(User, user_name=request.json["user_name"])
-        if user and check_password(request.json["password"], user[0].password):
-            return {"user": user[0].user_name}
+        user = (
+            db.query(User)
+            .where(user_name=request.json["user_name"])
+            .only("user_name", "password")
+            .first()
+        )
+        if user and check_password(request.json["password"], user.password):
+            return {"user": user.user_name}
         return None
 
     api.config["SECRET"] = "my_secret"
@@ -32,6 +46,23 @@ enable_jwt(app)
 db.create(User)
 
 
+@app.on_worker_init
+def reopen_database():
+    # the connections opened above must not be shared with forked workers
+    db.reopen()
+    cache_store.reopen()
+
+
+@app.on_shutdown
+def close_database():
+    db.close()
+
+
+@app.before_request
+def sync_cache(request, response):
+    db.sync_cache()
+
+
 @app.after_request
 def after_response(request, response):
     if response.json:
@@ -48,23 +79,22 @@ def home(request, response):
 
 @app.route("/user/{user_id:d}", allowed_methods=["get"])
 def user_detail(request, response, user_id):
-    user = db.get(User, id=user_id)
-    response.json = [
-        {
-            "user_name": u.user_name,
-            "password": u.password,
-            "create_id": str(u.created_at),
-        }
-        for u in user
-    ]
+    response.json = UserSerializer.many(db.get(User, id=user_id))
 
 
 @app.route("/user", allowed_methods=["post"])
 def create_user(request, response):
-    user_name = request.json["user_name"]
     password = generate_password_hash(request.json["password"])
-    user = User(user_name=user_name, password=password, created_at=datetime.now())
-    db.save(user)
+    user = User(
+        user_name=request.json["user_name"],
+        password=password,
+        created_at=datetime.now(),
+    )
+    try:
+        db.save(user)
+    except sqlite3.IntegrityError:
+        # the unique index rejects a taken user name, even from a racing request
+        response.status_code = 409
 
 
 if __name__ == "__main__":
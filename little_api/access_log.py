@@ -0,0 +1,153 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, TextIO
+
+
+class AccessLog:
+    """Structured access log written as JSON lines by a background thread.
+
+    `log` only appends the record to a deque (atomic, no lock) so requests
+    never wait on the file.  The writer thread wakes up every
+    `flush_interval` seconds, or once `batch_size` records are pending, and
+    writes them in one go.  The file is rotated to `path.1` ... once it
+    grows past `max_bytes`, keeping `backup_count` old files.  Writers
+    sharing the path only rotate the file they wrote to.  Successful
+    (< 400) responses are kept with probability `sample_rate`, errors are
+    always kept.  At most `max_pending` records wait to be written, newer
+    ones are counted in `dropped`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+        sample_rate: float = 1.0,
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+        max_pending: int = 100_000,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._records: deque = deque()
+        self._wakeup = threading.Event()
+        self._write_lock = threading.Lock()
+        self._file: Optional[TextIO] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def log(self, record: Dict) -> None:
+        if (
+            self.sample_rate < 1.0
+            and (record.get("status") or 0) < 400
+            and random.random() >= self.sample_rate
+        ):
+            return
+        if len(self._records) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._records.append(record)
+        if self._thread is None:
+            self._start()
+        if len(self._records) >= self.batch_size:
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        with self._write_lock:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="little-api-access-log", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes pending records"""
+        with self._write_lock:
+            lines = []
+            while True:
+                try:
+                    record = self._records.popleft()
+                except IndexError:
+                    break
+                lines.append(json.dumps(record, separators=(",", ":")) + "\n")
+            if not lines:
+                return
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            file = self._file
+            file.write("".join(lines))
+            file.flush()
+            if file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def _rotate(self) -> None:
+        file, self._file = self._file, None
+        if file is None:
+            return
+        try:
+            # workers sharing the path, e.g. `little-api serve --preload`, or
+            # logrotate may have moved the file already, then only reopen
+            if os.fstat(file.fileno()).st_ino != os.stat(self.path).st_ino:
+                return
+        except FileNotFoundError:
+            return
+        finally:
+            file.close()
+        try:
+            if self.backup_count < 1:
+                os.remove(self.path)
+                return
+            for idx in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{idx}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{idx + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        except OSError:
+            # e.g. another writer rotated between the check and the move, the
+            # next flush reopens the path either way
+            pass
+
+    def close(self) -> None:
+        """Stops the writer thread and writes anything still pending"""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def build_record(
+    environ: Dict, status: str, bytes_sent: int, timings: Dict, started: float
+) -> Dict:
+    """Access log record for a finished request, timings in milliseconds"""
+    timings = {phase: round(seconds * 1000, 3) for phase, seconds in timings.items()}
+    timings["total"] = round((time.perf_counter() - started) * 1000, 3)
+    return {
+        "time": time.time(),
+        "method": environ.get("REQUEST_METHOD"),
+        "route": environ.get("little_api.route"),
+        "status": int(status.split(" ", 1)[0]) if status else None,
+        "bytes": bytes_sent,
+        "timings": timings,
+    }
@@ -1,46 +1,198 @@
 import inspect
+import logging
 import os
-from typing import Callable, Dict, Iterator, List, Optional, Tuple, Type
-
-from jinja2 import Environment, FileSystemLoader
-from parse import parse
-from requests import Session as RequestsSession
-from webob import Request
-from whitenoise import WhiteNoise
-from wsgiadapter import WSGIAdapter as RequestsWSGIAdapter
+import time
+from collections import Counter
+from functools import cached_property
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
 
+from little_api.access_log import AccessLog, build_record
 from little_api.auth import generate_jwt_token
-from little_api.exceptions import RouteNotFoundException
-from little_api.response import Response
+from little_api.background import BackgroundExecutor
+from little_api.exceptions import (
+    MultipartError,
+    RequestEntityTooLarge,
+    RouteNotFoundException,
+)
+from little_api.request import Request
+from little_api.response import ClosingIterator, Response
+from little_api.testing import TestClient
 
-from .config import Config
+from .config import FRAMEWORK_SETTINGS, Config
 from .middleware import Middleware
 
+if TYPE_CHECKING:
+    from jinja2 import Environment
+    from whitenoise import WhiteNoise
+
+logger = logging.getLogger(__name__)
+
 
 class API:
     def __init__(
         self, templates_dir: str = "templates", static_dir: str = "static"
     ) -> None:
         self.routes: Dict = {}
-        self.exception_handlers: Dict = {}
-        self.templates_env = Environment(
-            loader=FileSystemLoader(os.path.abspath(templates_dir))
-        )
-        self.white_noise = WhiteNoise(self.wsgi_app, root=static_dir)
+        self.exception_handlers: Dict[Type[BaseException], Callable] = {}
+        # handler resolved for each raised exception type, see add_exception_handler
+        self._resolved_handlers: Dict[Type[BaseException], Callable] = {}
+        # exceptions raised while handling requests, by type
+        self.exception_counts: Counter = Counter()
+        # jinja and whitenoise are only set up when first needed
+        self.templates_dir = templates_dir
+        self.static_dir = static_dir
         self.middleware = Middleware(self)
-        self.config = Config()
+        self.config = Config(schema=FRAMEWORK_SETTINGS)
         self.add_exception_handler(RouteNotFoundException, self.default_404_response)
+        self.add_exception_handler(RequestEntityTooLarge, self.default_413_response)
+        self.add_exception_handler(MultipartError, self.default_400_response)
         self._before_request = lambda res, req: None
         self._after_request = lambda res, req: None
+        # runs work after responses are sent, replace to change its limits
+        self.background_executor = BackgroundExecutor()
+        self.access_log: Optional[AccessLog] = None
+        self._startup_hooks: List[Callable[[], None]] = []
+        self._worker_init_hooks: List[Callable[[], None]] = []
+        self._shutdown_hooks: List[Callable[[], None]] = []
+
+    @cached_property
+    def templates_env(self) -> "Environment":
+        from jinja2 import Environment, FileSystemLoader
+
+        return Environment(loader=FileSystemLoader(os.path.abspath(self.templates_dir)))
+
+    @cached_property
+    def white_noise(self) -> "WhiteNoise":
+        from whitenoise import WhiteNoise
+
+        return WhiteNoise(self.wsgi_app, root=self.static_dir)
+
+    def __call__(self, environ: Dict, start_response: Callable) -> Iterable:
+        if self.access_log is not None:
+            return self._logged_call(environ, start_response, self.access_log)
+        return self._call(environ, start_response)
 
-    def __call__(self, environ: Dict, start_response: Callable) -> Iterator:
+    def _logged_call(
+        self, environ: Dict, start_response: Callable, access_log: AccessLog
+    ) -> Iterable:
+        started = time.perf_counter()
+        timings = environ["little_api.timings"] = {}
+        started_response: List = []
+
+        def capture_status(status_line, headers, exc_info=None):
+            started_response[:] = [status_line, headers]
+            return start_response(status_line, headers, exc_info)
+
+        app_iter = self._call(environ, capture_status)
+        timings["app"] = time.perf_counter() - started
+
+        def log(bytes_sent: int) -> None:
+            status_line = started_response[0] if started_response else ""
+            record = build_record(environ, status_line, bytes_sent, timings, started)
+            access_log.log(record)
+
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        if isinstance(file_wrapper, type) and isinstance(app_iter, file_wrapper):
+            # wrapping a static file would hide it from the server's sendfile,
+            # log it now with its declared length instead
+            headers = started_response[1] if started_response else []
+            length = next(
+                (value for name, value in headers if name.lower() == "content-length"),
+                "0",
+            )
+            log(int(length))
+            return app_iter
+
+        sent = ClosingIterator(app_iter, lambda: log(sent.bytes_sent))
+        return sent
+
+    def _call(self, environ: Dict, start_response: Callable) -> Iterable:
         path_info = environ["PATH_INFO"]
 
         if path_info.startswith("/static"):
             environ["PATH_INFO"] = path_info[len("/static") :]  # noqa
-            return self.white_noise(environ, start_response)
+            app_iter = self.white_noise(environ, start_response)
+        else:
+            app_iter = self.middleware(environ, start_response)
+
+        response = environ.get("little_api.response")
+        if response is not None and response.background_tasks:
+            return ClosingIterator(
+                app_iter, lambda: self._run_background_tasks(response)
+            )
+        return app_iter
+
+    def _run_background_tasks(self, response: Response) -> None:
+        for func, args, kwargs in response.background_tasks:
+            self.background_executor.submit(func, *args, **kwargs)
+
+    def background(self, func: Callable, *args, **kwargs) -> bool:
+        """Queues `func(*args, **kwargs)` on the background executor now, see
+        `Response.add_background_task` to wait until the response is sent"""
+        return self.background_executor.submit(func, *args, **kwargs)
 
-        return self.middleware(environ, start_response)
+    def enable_access_log(self, path: str, **kwargs) -> AccessLog:
+        """Logs every request as a JSON line to `path`, see `AccessLog` for
+        the rotation, sampling and batching options"""
+        self.access_log = AccessLog(path, **kwargs)
+        return self.access_log
+
+    def on_startup(self, func: Callable[[], None]) -> Callable[[], None]:
+        """Decorator for functions run once the app is loaded, before the
+        server forks its workers when the app is preloaded"""
+        self._startup_hooks.append(func)
+        return func
+
+    def on_worker_init(self, func: Callable[[], None]) -> Callable[[], None]:
+        """Decorator for functions run in each worker process before it
+        handles requests, e.g. to reopen database connections"""
+        self._worker_init_hooks.append(func)
+        return func
+
+    def on_shutdown(self, func: Callable[[], None]) -> Callable[[], None]:
+        """Decorator for functions run when a worker exits, after the
+        background tasks have finished"""
+        self._shutdown_hooks.append(func)
+        return func
+
+    def warmup(self) -> None:
+        """Compiles the route patterns and templates and builds the static
+        file manifest, so preloading shares them with every worker"""
+        for path, handler_data in self.routes.items():
+            if "parser" not in handler_data:
+                handler_data["parser"] = self._compile_route(path)
+        if os.path.isdir(self.templates_dir):
+            for template_name in self.templates_env.list_templates():
+                self.templates_env.get_template(template_name)
+        if os.path.isdir(self.static_dir):
+            self.white_noise
+
+    def startup(self) -> None:
+        self.warmup()
+        for hook in self._startup_hooks:
+            hook()
+
+    def worker_init(self) -> None:
+        for hook in self._worker_init_hooks:
+            hook()
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Waits for queued background tasks to finish, flushes the access
+        log and runs the shutdown hooks"""
+        self.background_executor.shutdown(wait=True, timeout=timeout)
+        if self.access_log is not None:
+            self.access_log.close()
+        for hook in self._shutdown_hooks:
+            hook()
 
     def before_request(self, func) -> None:
         """Methods to allow user to override"""
@@ -50,8 +202,12 @@ class API:
         """Method to allow user to override"""
         self._after_request = func
 
-    def wsgi_app(self, environ: dict, start_response: Callable) -> Iterator:
-        request = Request(environ)
+    def build_request(self, environ: Dict) -> Request:
+        """Request for an environ, bodies are limited to `MAX_BODY_SIZE`"""
+        return Request(environ, max_body_size=self.config.settings.MAX_BODY_SIZE)
+
+    def wsgi_app(self, environ: dict, start_response: Callable) -> Iterable:
+        request = self.build_request(environ)
         response = self.handle_request(request)
         return response(environ, start_response)
 
@@ -61,7 +217,33 @@ class API:
     def add_exception_handler(
         self, exception_cls: Type[Exception], handler: Callable
     ) -> None:
-        self.exception_handlers[exception_cls.__name__] = handler
+        """Handles `exception_cls` and its subclasses, the handler of the
+        closest class in an exception's MRO is used"""
+        self.exception_handlers[exception_cls] = handler
+        self._resolved_handlers.clear()
+
+    def resolve_exception_handler(
+        self, exception_type: Type[BaseException]
+    ) -> Callable:
+        handler = self._resolved_handlers.get(exception_type)
+        if handler is None:
+            handler = next(
+                (
+                    self.exception_handlers[cls]
+                    for cls in exception_type.__mro__
+                    if cls in self.exception_handlers
+                ),
+                self.default_500_response,
+            )
+            self._resolved_handlers[exception_type] = handler
+        return handler
+
+    def handle_exception(
+        self, request: Request, response: Response, exc: Exception
+    ) -> None:
+        exception_type = type(exc)
+        self.exception_counts[exception_type] += 1
+        self.resolve_exception_handler(exception_type)(request, response, exc)
 
     def add_route(
         self, path: str, handler: Callable, allowed_methods: Optional[List] = None
@@ -70,7 +252,11 @@ class API:
         assert path not in self.routes, f"Duplicate route found: {path}"
         if allowed_methods is None:
             allowed_methods = ["get", "post", "put", "patch", "delete", "options"]
-        self.routes[path] = {"handler": handler, "allowed_methods": allowed_methods}
+        self.routes[path] = {
+            "handler": handler,
+            "allowed_methods": allowed_methods,
+            "path": path,
+        }
 
     def route(self, path, allowed_methods=None) -> Callable:
         """Decorator for adding routes"""
@@ -84,18 +270,34 @@ class API:
     def find_handler(self, request_path: str) -> Tuple:
         """Finds handler for a given url path"""
         for path, handler_data in self.routes.items():
-            parse_result = parse(path, request_path)
+            parser = handler_data.get("parser")
+            if parser is None:
+                parser = handler_data["parser"] = self._compile_route(path)
+            parse_result = parser.parse(request_path)
             if parse_result is not None:
                 return handler_data, parse_result.named
         return None, None
 
+    @staticmethod
+    def _compile_route(path: str):
+        from parse import compile
+
+        return compile(path)
+
     def handle_request(self, request: Request) -> Response:
         """Main method to handle the request"""
         response = Response()
-        self._before_request(request, response)
-        handler_data, kwargs = self.find_handler(request_path=request.path)
+        environ = request.environ
+        environ["little_api.response"] = response
+        timings = environ.get("little_api.timings")
+        started = handler_started = time.perf_counter()
         try:
+            self._before_request(request, response)
+            handler_data, kwargs = self.find_handler(request_path=request.path)
+            handler_started = time.perf_counter()
+            request.check_body_size()
             if handler_data is not None:
+                environ["little_api.route"] = handler_data["path"]
                 handler = handler_data["handler"]
                 allowed_methods = handler_data["allowed_methods"]
                 if inspect.isclass(handler):
@@ -110,11 +312,13 @@ class API:
             else:
                 raise RouteNotFoundException("Not found ..")
         except Exception as e:
-            exception_handler = self.exception_handlers.get(type(e).__name__)
-            if exception_handler is None:
-                raise e
-            exception_handler(request, response, e)
+            self.handle_exception(request, response, e)
+        after_started = time.perf_counter()
         self._after_request(request, response)
+        if timings is not None:
+            timings["before_request"] = handler_started - started
+            timings["handler"] = after_started - handler_started
+            timings["after_request"] = time.perf_counter() - after_started
         return response
 
     def default_404_response(self, request: Request, response: Response, exc) -> None:
@@ -122,11 +326,36 @@ class API:
         response.status_code = 404
         response.text = "Not Found.."
 
-    def test_session(self, base_url="http://testserver") -> RequestsSession:
-        """Used for Testing"""
-        session = RequestsSession()
-        session.mount(prefix=base_url, adapter=RequestsWSGIAdapter(self))
-        return session
+    def default_400_response(self, request: Request, response: Response, exc) -> None:
+        """Response for a malformed request body"""
+        response.status_code = 400
+        response.text = "Bad Request"
+
+    def default_413_response(self, request: Request, response: Response, exc) -> None:
+        """Response for a body larger than the `MAX_BODY_SIZE` config"""
+        response.status_code = 413
+        response.text = "Request Entity Too Large"
+
+    def default_500_response(self, request: Request, response: Response, exc) -> None:
+        """Response for an unhandled exception.  Only the first exception of
+        each type is logged with its traceback, later ones are counted in
+        `exception_counts` so error storms stay cheap"""
+        exception_type = type(exc)
+        if self.exception_counts[exception_type] <= 1:
+            logger.error("Unhandled exception on %s", request.path, exc_info=exc)
+        else:
+            logger.debug("Unhandled %s on %s", exception_type.__name__, request.path)
+        request.environ["little_api.exception"] = exc
+        response.status_code = 500
+        response.json = {"error": "Internal Server Error"}
+
+    def test_session(
+        self, base_url="http://testserver", raise_server_exceptions=True
+    ) -> TestClient:
+        """In process client for testing, calls the app without any network"""
+        return TestClient(
+            self, base_url=base_url, raise_server_exceptions=raise_server_exceptions
+        )
 
     def template(self, template_name, context: Optional[Dict] = None) -> bytes:
         if context is None:
@@ -139,8 +368,9 @@ class API:
         def jwt_login(request, response) -> None:
             claims = validate_user_func(request)
             if claims:
+                settings = self.config.settings
                 token = generate_jwt_token(
-                    claims, self.config["SECRET"], self.config["JWT_EXPIRE_SECONDS"]
+                    claims, settings.SECRET, settings.JWT_EXPIRE_SECONDS
                 )
                 response.json = {"token": token}
             else:
@@ -0,0 +1,284 @@
+import asyncio
+import queue
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple, Type
+
+from little_api.orm import Database, Query, QueryCache, Table
+
+_STOP = object()
+
+
+class AsyncQuery:
+    """`Query` whose results are awaited, e.g.
+    `await adb.query(User).where(age__gte=18).limit(10).all()`"""
+
+    def __init__(self, adb: "AsyncDatabase", query: Query):
+        self._adb = adb
+        self._query = query
+
+    def _chain(self, method: str, *args, **kwargs) -> "AsyncQuery":
+        return AsyncQuery(self._adb, getattr(self._query, method)(*args, **kwargs))
+
+    async def _run(self, method: str, *args, **kwargs):
+        query = self._query
+        return await self._adb.read(
+            lambda db: getattr(query.bind(db), method)(*args, **kwargs)
+        )
+
+    def where(self, **kwargs) -> "AsyncQuery":
+        return self._chain("where", **kwargs)
+
+    def order_by(self, *columns: str) -> "AsyncQuery":
+        return self._chain("order_by", *columns)
+
+    def limit(self, limit: int) -> "AsyncQuery":
+        return self._chain("limit", limit)
+
+    def offset(self, offset: int) -> "AsyncQuery":
+        return self._chain("offset", offset)
+
+    def after(self, *values) -> "AsyncQuery":
+        return self._chain("after", *values)
+
+    def only(self, *columns: str) -> "AsyncQuery":
+        return self._chain("only", *columns)
+
+    async def all(self, mode: str = "instances"):
+        return await self._run("all", mode)
+
+    async def first(self):
+        return await self._run("first")
+
+    async def count(self, column: str = "*") -> int:
+        return await self._run("count", column)
+
+    async def exists(self) -> bool:
+        return await self._run("exists")
+
+    async def sum(self, column: str):
+        return await self._run("sum", column)
+
+    async def avg(self, column: str):
+        return await self._run("avg", column)
+
+    async def min(self, column: str):
+        return await self._run("min", column)
+
+    async def max(self, column: str):
+        return await self._run("max", column)
+
+    async def group_by(self, *columns: str, **aggregates: Tuple[str, str]):
+        return await self._run("group_by", *columns, **aggregates)
+
+
+class AsyncDatabase:
+    """Awaitable facade over `Database` for use from async handlers.
+
+    A dedicated writer thread owns the write connection.  Queued writes are
+    grouped into one transaction (up to `max_batch` per commit) and each
+    awaiting caller resumes once its write is committed.  At most
+    `max_queue` writes per event loop are in flight, further writers wait
+    for room on the loop.
+    Reads run on `readers` threads with their own connections, or on the
+    writer thread for in-memory databases.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cache: Optional[QueryCache] = None,
+        readers: int = 2,
+        max_queue: int = 1000,
+        max_batch: int = 100,
+    ):
+        self.path = path
+        self.cache = cache
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.commits = 0
+        self._queue: queue.Queue = queue.Queue()
+        # backpressure per event loop, so waiting writers don't hold threads
+        self._slots: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        # `close` and submissions agree on whether the writer still takes work
+        self._closed = False
+        self._submit_lock = threading.Lock()
+        self._local = threading.local()
+        # every reader thread's connection, closed by `close`
+        self._reader_dbs: List[Database] = []
+        self._reader_lock = threading.Lock()
+        self._readers = None
+        if path != ":memory:" and readers:
+            self._readers = ThreadPoolExecutor(
+                max_workers=readers, thread_name_prefix="little-api-db-reader"
+            )
+        ready: Future = Future()
+        self._writer = threading.Thread(
+            target=self._write_loop,
+            args=(ready,),
+            name="little-api-db-writer",
+            daemon=True,
+        )
+        self._writer.start()
+        ready.result()
+
+    def _write_loop(self, ready: Future) -> None:
+        try:
+            db = Database(self.path, cache=self.cache)
+            if self.path != ":memory:":
+                # readers aren't blocked by the writer in WAL mode
+                db.conn.execute("PRAGMA journal_mode=WAL;")
+        except Exception as e:
+            ready.set_exception(e)
+            return
+        ready.set_result(None)
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+            # skip writes whose caller has given up, e.g. `asyncio.wait_for`,
+            # a running future can no longer be cancelled under us
+            batch = [
+                item
+                for item in batch
+                if item is not _STOP and item[1].set_running_or_notify_cancel()
+            ]
+            if batch:
+                try:
+                    self._run_batch(db, batch)
+                except BaseException as e:
+                    self._abort(batch, e)
+                    db.close()
+                    raise
+        db.close()
+
+    def _abort(self, batch: List[Tuple[Callable, Future]], cause: BaseException):
+        """Fails the batch and every queued write once the writer thread dies"""
+        with self._submit_lock:
+            self._closed = True
+        pending = [future for _, future in batch if not future.done()]
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                pending.append(item[1])
+        for future in pending:
+            error = RuntimeError("AsyncDatabase writer thread stopped")
+            error.__cause__ = cause
+            future.set_exception(error)
+
+    def _run_batch(self, db: Database, batch: List[Tuple[Callable, Future]]) -> None:
+        results = []
+        try:
+            with db.transaction():
+                for func, _ in batch:
+                    results.append(func(db))
+        except Exception:
+            # isolate the failure by retrying each write on its own
+            for func, future in batch:
+                try:
+                    with db.transaction():
+                        result = func(db)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    self.commits += 1
+                    future.set_result(result)
+            return
+        self.commits += 1
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _reader_db(self) -> Database:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # only used by this thread, but closed from the one calling `close`
+            db = self._local.db = Database(
+                self.path, cache=self.cache, check_same_thread=False
+            )
+            with self._reader_lock:
+                self._reader_dbs.append(db)
+        return db
+
+    async def _submit(self, func: Callable[[Database], Any]):
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_queue)
+        async with slots:
+            future: Future = Future()
+            with self._submit_lock:
+                if self._closed:
+                    raise RuntimeError("AsyncDatabase is closed")
+                self._queue.put_nowait((func, future))
+            return await asyncio.wrap_future(future)
+
+    async def write(self, func: Callable[[Database], Any]):
+        """Runs `func(db)` on the writer thread as part of a group commit"""
+        return await self._submit(func)
+
+    async def read(self, func: Callable[[Database], Any]):
+        """Runs `func(db)` on a reader connection"""
+        if self._readers is None:
+            return await self._submit(func)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._readers, lambda: func(self._reader_db())
+        )
+
+    async def create(self, table: Type[Table]) -> None:
+        await self.write(lambda db: db.create(table))
+
+    async def save(self, instance: Table) -> None:
+        await self.write(lambda db: db.save(instance))
+
+    async def save_many(self, instances: List[Table]) -> None:
+        await self.write(lambda db: db.save_many(instances))
+
+    async def update(self, instance: Table) -> None:
+        await self.write(lambda db: db.update(instance))
+
+    async def delete(self, instance: Table) -> None:
+        await self.write(lambda db: db.delete(instance))
+
+    async def get(self, table: Type[Table], mode: str = "instances", **kwargs):
+        return await self.read(lambda db: db.get(table, mode=mode, **kwargs))
+
+    async def all(self, table: Type[Table], mode: str = "instances"):
+        return await self.read(lambda db: db.all(table, mode=mode))
+
+    async def search(self, table: Type[Table], query: str, **kwargs) -> List:
+        return await self.read(lambda db: db.search(table, query, **kwargs))
+
+    async def count(self, table: Type[Table], **kwargs) -> int:
+        return await self.read(lambda db: db.count(table, **kwargs))
+
+    async def exists(self, table: Type[Table], **kwargs) -> bool:
+        return await self.read(lambda db: db.exists(table, **kwargs))
+
+    def query(self, table: Type[Table]) -> AsyncQuery:
+        # bound to a connection when the query runs
+        return AsyncQuery(self, Query(None, table))  # type: ignore[arg-type]
+
+    def close(self) -> None:
+        """Commits queued writes and closes the connections, later writes
+        raise `RuntimeError`"""
+        with self._submit_lock:
+            self._closed = True
+            self._queue.put_nowait(_STOP)
+        self._writer.join()
+        if self._readers is not None:
+            self._readers.shutdown(wait=True)
+        with self._reader_lock:
+            reader_dbs, self._reader_dbs = self._reader_dbs, []
+        for db in reader_dbs:
+            db.close()
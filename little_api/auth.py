@@ -3,8 +3,6 @@ from crypt import crypt
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
-import jwt
-
 from little_api.middleware import Middleware
 
 
@@ -32,6 +30,8 @@ class TokenMiddleware(Middleware):
 def generate_jwt_token(
     custom_claims: Dict, secret: str, expire_seconds: int, algorithm: str = "HS256"
 ):
+    import jwt
+
     expire_datetime = datetime.utcnow() + timedelta(seconds=expire_seconds)
     claims = {"exp": expire_datetime}
     claims.update(custom_claims)
@@ -42,6 +42,8 @@ def generate_jwt_token(
 def decode_jwt_token(
     token: str, secret: str, algorithm: Optional[List[str]] = None
 ) -> Dict:
+    import jwt
+
     if not algorithm:
         algorithm = ["HS256"]
     claims = jwt.decode(token, secret, algorithm)  # type: ignore
@@ -0,0 +1,136 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop", "block", "run")
+
+_STOP = object()
+
+
+class BackgroundExecutor:
+    """Bounded thread pool for work that shouldn't delay responses.
+
+    Tasks wait in a queue of at most `max_queue` entries.  When it is full
+    `overflow` decides what happens to a new task: "drop" discards it,
+    "block" waits for room and "run" runs it in the submitting thread.
+    Tasks submitted after `shutdown` are dropped.  Worker threads are only
+    started on the first submit.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 1000, overflow="drop"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.max_workers = max_workers
+        self.overflow = overflow
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._threads or self._shutdown:
+                return
+            for idx in range(self.max_workers):
+                thread = threading.Thread(
+                    target=self._work, name=f"little-api-background-{idx}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            task = self._queue.get()
+            if task is _STOP:
+                break
+            self._run(*task)
+
+    def _run(self, queued_at: float, func: Callable, args, kwargs) -> None:
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception("Background task %r failed", func)
+            with self._lock:
+                self.failed += 1
+        latency = time.monotonic() - queued_at
+        with self._lock:
+            self.completed += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def submit(self, func: Callable, *args, **kwargs) -> bool:
+        """Queues `func(*args, **kwargs)`, returns False if it was dropped"""
+        if self._shutdown:
+            # e.g. from a response closed while the server shuts down, where
+            # raising would go to the server
+            logger.warning("Background executor shut down, dropped task %r", func)
+            with self._lock:
+                self.dropped += 1
+            return False
+        if not self._threads:
+            self._start()
+        task = (time.monotonic(), func, args, kwargs)
+        with self._lock:
+            self.submitted += 1
+        try:
+            self._queue.put(task, block=self.overflow == "block")
+        except queue.Full:
+            if self.overflow == "run":
+                self._run(*task)
+                return True
+            logger.warning("Background queue full, dropped task %r", func)
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                "queue_depth": self.queue_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "avg_latency": (
+                    self.total_latency / self.completed if self.completed else 0.0
+                ),
+                "max_latency": self.max_latency,
+            }
+
+    def shutdown(self, wait: bool = True, timeout=None) -> None:
+        """Stops accepting tasks, by default running the queued ones first"""
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            threads = list(self._threads)
+        if not wait:
+            # discard queued tasks so the workers stop promptly
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+        for _ in threads:
+            self._queue.put(_STOP)
+        if not wait:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in threads:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            thread.join(remaining if remaining is None else max(remaining, 0))
@@ -0,0 +1,258 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class CacheStore:
+    """Interface of the cache backends.
+
+    `LRUCache` keeps entries in the process, `SQLiteCache` shares them
+    between the processes of a host.  Subclasses implement `get`, `set`,
+    `delete` and `clear`, and should make `get_or_set` atomic.
+    """
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: Hashable) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def get_or_set(
+        self, key: Hashable, factory: Callable[[], Any], ttl: Optional[float] = None
+    ) -> Any:
+        """Cached value for `key`, storing `factory()` if there's none.  When
+        callers race, every one of them gets the value stored first."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+
+class LRUCache(CacheStore):
+    """Thread safe least-recently-used cache with an optional time to live"""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: Hashable) -> Any:
+        """Entry's value or _MISSING, call with the lock held"""
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, key: Hashable, value: Any, ttl: Optional[float]) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._get(key)
+        return default if value is _MISSING else value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._set(key, value, ttl)
+
+    def get_or_set(
+        self, key: Hashable, factory: Callable[[], Any], ttl: Optional[float] = None
+    ) -> Any:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        # the factory runs without the lock, a racing caller may store first
+        created = factory()
+        with self._lock:
+            value = self._get(key)
+            if value is _MISSING:
+                self._set(key, created, ttl)
+                value = created
+        return value
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(CacheStore):
+    """Cache shared by every process on a host through a WAL mode sqlite
+    file, e.g. all the workers of `little-api serve`.
+
+    Values are pickled, so only point it at files the app alone writes.
+    Entries expire after `ttl` seconds.  Every `prune_interval` writes the
+    expired entries are deleted, then the oldest written ones until at most
+    `max_entries` entries and `max_bytes` of pickled values remain.  Each
+    thread uses its own connection, call `reopen` in forked workers, e.g.
+    from `API.on_worker_init`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        table: str = "little_api_cache",
+        prune_interval: int = 64,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.table = table
+        self.prune_interval = prune_interval
+        self._writes = 0
+        self._local = threading.local()
+        with self.db.transaction():
+            self.db.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key PRIMARY KEY, "
+                "value BLOB NOT NULL, expires_at REAL, size INTEGER NOT NULL);"
+            )
+            self.db.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_expires_at "
+                f"ON {table} (expires_at);"
+            )
+
+    @property
+    def db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            from little_api.orm import Database
+
+            db = self._local.db = Database(self.path)
+            if self.path != ":memory:":
+                db.conn.execute("PRAGMA journal_mode=WAL;")
+                db.conn.execute("PRAGMA synchronous=NORMAL;")
+        return db
+
+    def reopen(self) -> None:
+        """Drops the connections, new ones are opened on next use"""
+        self._local = threading.local()
+
+    @staticmethod
+    def _key(key: Hashable):
+        return key if isinstance(key, str) else pickle.dumps(key, protocol=4)
+
+    def _expires_at(self, ttl: Optional[float]) -> Optional[float]:
+        ttl = self.ttl if ttl is None else ttl
+        return None if ttl is None else time.time() + ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        row = self.db.conn.execute(
+            f"SELECT value, expires_at FROM {self.table} WHERE key = ?;",
+            (self._key(key),),
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return default
+        return pickle.loads(row[0])
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.db.transaction():
+            # replacing gives the row a new rowid, the order pruning goes by
+            self.db.conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, size) "
+                "VALUES (?, ?, ?, ?);",
+                (self._key(key), data, self._expires_at(ttl), len(data)),
+            )
+        self._wrote()
+
+    def get_or_set(
+        self, key: Hashable, factory: Callable[[], Any], ttl: Optional[float] = None
+    ) -> Any:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        data = pickle.dumps(factory(), protocol=pickle.HIGHEST_PROTOCOL)
+        db_key = self._key(key)
+        with self.db.transaction():
+            # only replaces an expired entry, a live one was stored by a
+            # racing process and wins
+            self.db.conn.execute(
+                f"INSERT INTO {self.table} (key, value, expires_at, size) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                "value = excluded.value, expires_at = excluded.expires_at, "
+                f"size = excluded.size WHERE {self.table}.expires_at <= ?;",
+                (db_key, data, self._expires_at(ttl), len(data), time.time()),
+            )
+            (stored,) = self.db.conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ?;", (db_key,)
+            ).fetchone()
+        self._wrote()
+        return pickle.loads(stored)
+
+    def delete(self, key: Hashable) -> None:
+        with self.db.transaction():
+            self.db.conn.execute(
+                f"DELETE FROM {self.table} WHERE key = ?;", (self._key(key),)
+            )
+
+    def clear(self) -> None:
+        with self.db.transaction():
+            self.db.conn.execute(f"DELETE FROM {self.table};")
+
+    def _wrote(self) -> None:
+        self._writes += 1
+        if self._writes % self.prune_interval == 0:
+            self.prune()
+
+    def prune(self) -> None:
+        """Deletes expired entries, then the oldest until within the caps"""
+        table = self.table
+        with self.db.transaction():
+            conn = self.db.conn
+            conn.execute(f"DELETE FROM {table} WHERE expires_at <= ?;", (time.time(),))
+            if self.max_entries is not None:
+                conn.execute(
+                    f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} "
+                    f"ORDER BY rowid DESC LIMIT -1 OFFSET ?);",
+                    (self.max_entries,),
+                )
+            if self.max_bytes is not None:
+                conn.execute(
+                    f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM "
+                    f"(SELECT rowid, SUM(size) OVER (ORDER BY rowid DESC) AS total "
+                    f"FROM {table}) WHERE total > ?);",
+                    (self.max_bytes,),
+                )
+
+    def __len__(self) -> int:
+        (count,) = self.db.conn.execute(
+            f"SELECT COUNT(*) FROM {self.table} "
+            "WHERE expires_at IS NULL OR expires_at > ?;",
+            (time.time(),),
+        ).fetchone()
+        return count
@@ -1,21 +1,246 @@
+import json
+import logging
+import os
+import signal
+import threading
 from collections.abc import MutableMapping
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+from little_api.exceptions import ConfigError
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# settings read by little-api itself, as (type, default)
+FRAMEWORK_SETTINGS: Dict[str, Tuple[type, Any]] = {
+    "SECRET": (str, None),
+    "JWT_EXPIRE_SECONDS": (int, 3600),
+    "MAX_BODY_SIZE": (int, None),
+}
+
+TRUE_STRINGS = {"1", "true", "yes", "on"}
+FALSE_STRINGS = {"0", "false", "no", "off", ""}
+
+
+def _coerce(key: str, value: str, value_type: type) -> Any:
+    """Converts an environment variable's string to the setting's type"""
+    try:
+        if value_type is bool:
+            if value.lower() not in TRUE_STRINGS | FALSE_STRINGS:
+                raise ValueError(value)
+            return value.lower() in TRUE_STRINGS
+        if value_type in (list, dict):
+            return json.loads(value)
+        return value_type(value)
+    except ValueError:
+        raise ConfigError(
+            f"{key} must be {value_type.__name__}, got {value!r}"
+        ) from None
+
+
+class Settings:
+    """Immutable snapshot of a `Config`, read settings as attributes, e.g.
+    `api.config.settings.SECRET`.  Only keys that are identifiers become
+    attributes."""
+
+    __slots__: Tuple[str, ...] = ()
+
+    def __init__(self, values: Dict[str, Any]):
+        for key in self.__slots__:
+            object.__setattr__(self, key, values[key])
+
+    def __getattr__(self, key: str) -> Any:
+        raise AttributeError(f"No setting {key!r}")
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Settings are read only, set them on the Config")
+
+    def __delattr__(self, key):
+        raise AttributeError("Settings are read only, set them on the Config")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self):
+        return f"<Settings {sorted(self.__slots__)}>"
+
+
+_settings_classes: Dict[Tuple[str, ...], Type[Settings]] = {}
+
+
+def _settings_class(keys: Tuple[str, ...]) -> Type[Settings]:
+    cls = _settings_classes.get(keys)
+    if cls is None:
+        cls = type("Settings", (Settings,), {"__slots__": keys})
+        _settings_classes[keys] = cls
+    return cls
 
 
 class Config(MutableMapping):
-    def __init__(self):
-        self._config = {}
+    """Settings of an app, set as items or loaded from the environment and
+    TOML/JSON files.
+
+    `define` declares a setting's type, values are validated against it
+    and environment strings converted to it.  `settings` is a frozen
+    snapshot that is rebuilt after a change, and `reload` reruns the loads
+    and swaps the snapshot atomically, e.g. on SIGHUP.
+    """
+
+    def __init__(self, schema: Optional[Dict[str, Tuple[type, Any]]] = None):
+        self._config: Dict[str, Any] = {}
+        self._types: Dict[str, type] = {}
+        self._defaults: Dict[str, Any] = {}
+        self._sources: List[Tuple[str, Any]] = []
+        # keys whose value came from a source rather than being set directly
+        self._loaded: Set[str] = set()
+        self._settings: Optional[Settings] = None
+        # reentrant, a signal handler's reload may interrupt one in progress
+        self._lock = threading.RLock()
+        for key, (value_type, default) in (schema or {}).items():
+            self.define(key, value_type, default)
+
+    def define(self, key: str, value_type: type, default: Any = _MISSING) -> None:
+        """Declares a setting's type and optionally its default"""
+        self._types[key] = value_type
+        if default is not _MISSING:
+            self._defaults[key] = default
+        self._settings = None
+
+    def validate(self, key: str, value: Any) -> None:
+        value_type = self._types.get(key)
+        if value_type is None or value is None:
+            return
+        if value_type is float and type(value) is int:
+            return
+        # bool is an int subclass but not a valid int setting
+        if not isinstance(value, value_type) or (
+            isinstance(value, bool) and value_type is not bool
+        ):
+            raise ConfigError(
+                f"{key} must be {value_type.__name__}, got {type(value).__name__}"
+            )
 
     def __setitem__(self, key, value):
+        self.validate(key, value)
         self._config[key] = value
+        self._loaded.discard(key)
+        self._settings = None
 
     def __getitem__(self, key):
-        return self._config[key]
+        try:
+            return self._config[key]
+        except KeyError:
+            return self._defaults[key]
 
     def __delitem__(self, key):
+        """Removes a set value, a defined default remains"""
         del self._config[key]
+        self._loaded.discard(key)
+        self._settings = None
 
     def __len__(self):
-        return self._config.__len__()
+        return len(self._defaults.keys() | self._config.keys())
 
     def __iter__(self):
-        yield self._config
+        return iter({**self._defaults, **self._config})
+
+    def _read_env(self, prefix: str) -> Dict[str, Any]:
+        values = {}
+        for name, value in os.environ.items():
+            if name.startswith(prefix) and len(name) > len(prefix):
+                key = name[len(prefix) :]  # noqa
+                value_type = self._types.get(key)
+                values[key] = (
+                    value if value_type is None else _coerce(key, value, value_type)
+                )
+        return values
+
+    def _read_file(self, path: str, section: Optional[str]) -> Dict[str, Any]:
+        if path.endswith(".toml"):
+            try:
+                import tomllib
+            except ImportError:  # python < 3.11
+                import tomli as tomllib  # type: ignore[no-redef]
+
+            with open(path, "rb") as f:
+                values = tomllib.load(f)
+        elif path.endswith(".json"):
+            with open(path) as f:
+                values = json.load(f)
+        else:
+            raise ConfigError(f"Unsupported config file type: {path}")
+        if section is not None:
+            values = values.get(section, {})
+        if not isinstance(values, dict):
+            raise ConfigError(f"{path} doesn't contain a table of settings")
+        return values
+
+    def _read(self, source: Tuple[str, Any]) -> Dict[str, Any]:
+        kind, args = source
+        values = self._read_env(*args) if kind == "env" else self._read_file(*args)
+        for key, value in values.items():
+            self.validate(key, value)
+        return values
+
+    def _load(self, source: Tuple[str, Any]) -> None:
+        values = self._read(source)
+        self._config.update(values)
+        self._loaded.update(values)
+        self._sources.append(source)
+        self._settings = None
+
+    def load_env(self, prefix: str = "LITTLE_API_") -> None:
+        """Sets `prefix`KEY environment variables as KEY"""
+        self._load(("env", (prefix,)))
+
+    def load_file(self, path: str, section: Optional[str] = None) -> None:
+        """Sets the top level keys of a .toml or .json file, or of its
+        `section` table"""
+        self._load(("file", (path, section)))
+
+    def freeze(self, values: Optional[Dict[str, Any]] = None) -> Settings:
+        """Snapshot of the defaults overlaid with the current values"""
+        values = {**self._defaults, **(self._config if values is None else values)}
+        keys = tuple(sorted(key for key in values if key.isidentifier()))
+        return _settings_class(keys)(values)
+
+    @property
+    def settings(self) -> Settings:
+        settings = self._settings
+        if settings is None:
+            settings = self._settings = self.freeze()
+        return settings
+
+    def reload(self) -> None:
+        """Reruns the env and file loads in order and swaps in the new
+        values and snapshot.  Keys no longer in any source are dropped,
+        values set directly are kept unless a source sets them.  On an error
+        the current ones are kept."""
+        with self._lock:
+            values = {
+                key: value
+                for key, value in self._config.items()
+                if key not in self._loaded
+            }
+            loaded: Set[str] = set()
+            try:
+                for source in self._sources:
+                    source_values = self._read(source)
+                    values.update(source_values)
+                    loaded.update(source_values)
+            except (ConfigError, OSError, ValueError):
+                logger.exception("Config reload failed, keeping current settings")
+                return
+            settings = self.freeze(values)
+            self._config = values
+            self._loaded = loaded
+            self._settings = settings
+
+    def reload_on_signal(self, signum: Optional[int] = None) -> None:
+        """Reloads whenever the process gets `signum`, SIGHUP by default.
+        Must be called from the main thread, `little-api serve` already
+        reloads on its own SIGHUP."""
+        if signum is None:
+            signum = signal.SIGHUP
+        signal.signal(signum, lambda *args: self.reload())
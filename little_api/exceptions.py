@@ -1,2 +1,18 @@
 class RouteNotFoundException(Exception):
     pass
+
+
+class StaleInstanceError(Exception):
+    pass
+
+
+class RequestEntityTooLarge(Exception):
+    pass
+
+
+class MultipartError(Exception):
+    pass
+
+
+class ConfigError(Exception):
+    pass
@@ -1,6 +1,3 @@
-from webob import Request
-
-
 class Middleware:
     def __init__(self, app):
         self.app = app
@@ -20,7 +17,10 @@ class Middleware:
         self.process_response(request, response)
         return response
 
+    def build_request(self, environ):
+        return self.app.build_request(environ)
+
     def __call__(self, environ, start_response):
-        request = Request(environ)
+        request = self.build_request(environ)
         response = self.app.handle_request(request)
         return response(environ, start_response)
@@ -0,0 +1,213 @@
+import os
+import re
+import shutil
+import tempfile
+from typing import IO, Callable, Dict, Iterable, Iterator, Optional, Union
+
+from little_api.exceptions import MultipartError, RequestEntityTooLarge
+
+# parts above this size are moved from memory to a temporary file
+SPOOL_THRESHOLD = 1024 * 1024
+MAX_HEADER_SIZE = 16 * 1024
+
+_PARAM_RE = re.compile(r';\s*([\w*-]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)')
+
+Destination = Union[str, Callable[["Part"], Optional[str]]]
+
+
+def parse_options_header(value: str):
+    """Splits e.g. `form-data; name="file"` into its value and parameters"""
+    main, _, rest = value.partition(";")
+    params = {}
+    for key, param in _PARAM_RE.findall(";" + rest):
+        param = param.strip()
+        if param[:1] == param[-1:] == '"' and len(param) > 1:
+            param = re.sub(r"\\(.)", r"\1", param[1:-1])
+        params[key.lower()] = param
+    return main.strip().lower(), params
+
+
+class Part:
+    """One part of a multipart body, its data is in `file`, spooled to disk
+    past the parser's threshold or written to `path` when it had a
+    destination"""
+
+    def __init__(self, headers: Dict[str, str], file: IO[bytes], path=None):
+        self.headers = headers
+        _, params = parse_options_header(headers.get("content-disposition", ""))
+        self.name = params.get("name")
+        self.filename = params.get("filename")
+        self.content_type = headers.get("content-type", "text/plain")
+        self.charset = parse_options_header(self.content_type)[1].get(
+            "charset", "UTF-8"
+        )
+        self.file = file
+        self.path = path
+        self.size = 0
+
+    def _write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.size += len(data)
+
+    def _finish(self) -> None:
+        if self.path is not None:
+            self.file.close()
+        else:
+            self.file.seek(0)
+
+    def read(self) -> bytes:
+        if self.path is not None:
+            with open(self.path, "rb") as f:
+                return f.read()
+        self.file.seek(0)
+        return self.file.read()
+
+    @property
+    def value(self) -> str:
+        """Contents decoded as text, for plain form fields"""
+        return self.read().decode(self.charset)
+
+    def save(self, path: str) -> None:
+        """Writes the contents to `path` without loading them in memory"""
+        if self.path is not None:
+            if os.path.abspath(path) != os.path.abspath(self.path):
+                shutil.copyfile(self.path, path)
+            return
+        self.file.seek(0)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(self.file, f)
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __repr__(self):
+        return f"<Part name={self.name!r} filename={self.filename!r} {self.size}B>"
+
+
+class MultipartParser:
+    """Incremental multipart/form-data parser.
+
+    Reads the body chunk by chunk and yields each part once it is complete,
+    so at most `spool_threshold` bytes of a part are held in memory.  A part
+    whose name is in `destinations` is written straight to that path
+    instead, the value may also be a function of the part returning a path
+    or None to spool it.  Parts over `max_part_size` and bodies over
+    `max_total_size` raise `RequestEntityTooLarge`.
+    """
+
+    def __init__(
+        self,
+        boundary: str,
+        spool_threshold: int = SPOOL_THRESHOLD,
+        max_part_size: Optional[int] = None,
+        max_total_size: Optional[int] = None,
+        destinations: Optional[Dict[str, Destination]] = None,
+    ):
+        if not boundary or len(boundary) > 200:
+            raise MultipartError("Invalid multipart boundary")
+        self.delimiter = b"\r\n--" + boundary.encode("latin-1")
+        self.spool_threshold = spool_threshold
+        self.max_part_size = max_part_size
+        self.max_total_size = max_total_size
+        self.destinations = destinations or {}
+
+    def _open(self, headers: Dict[str, str]) -> Part:
+        part = Part(headers, tempfile.SpooledTemporaryFile(self.spool_threshold))
+        destination = self.destinations.get(part.name or "")
+        if callable(destination):
+            destination = destination(part)
+        if destination is not None:
+            part.file.close()
+            part.file = open(destination, "wb")
+            part.path = destination
+        return part
+
+    def _discard(self, part: Optional[Part]) -> None:
+        if part is None:
+            return
+        part.close()
+        if part.path is not None and os.path.exists(part.path):
+            os.remove(part.path)
+
+    def _write(self, part: Part, data: bytes) -> None:
+        size = part.size + len(data)
+        if self.max_part_size is not None and size > self.max_part_size:
+            raise RequestEntityTooLarge(
+                f"Part {part.name!r} exceeds {self.max_part_size} bytes"
+            )
+        part._write(data)
+
+    def parse(self, chunks: Iterable[bytes]) -> Iterator[Part]:
+        delimiter = self.delimiter
+        keep = len(delimiter) + 1
+        # the first boundary isn't preceded by a line break
+        buffer = b"\r\n"
+        state = "preamble"
+        part: Optional[Part] = None
+        total = 0
+        chunks = iter(chunks)
+        try:
+            while True:
+                if state == "preamble":
+                    idx = buffer.find(delimiter)
+                    if idx >= 0:
+                        buffer = buffer[idx + len(delimiter) :]  # noqa
+                        state = "boundary"
+                        continue
+                    buffer = buffer[-keep:]
+                elif state == "boundary":
+                    if len(buffer) >= 2:
+                        if buffer.startswith(b"--"):
+                            return
+                        if not buffer.startswith(b"\r\n"):
+                            raise MultipartError("Malformed multipart boundary")
+                        buffer = buffer[2:]
+                        state = "headers"
+                        continue
+                elif state == "headers":
+                    idx = buffer.find(b"\r\n\r\n")
+                    if idx >= 0:
+                        part = self._open(self._parse_headers(buffer[:idx]))
+                        buffer = buffer[idx + 4 :]  # noqa
+                        state = "body"
+                        continue
+                    if len(buffer) > MAX_HEADER_SIZE:
+                        raise MultipartError("Multipart headers too large")
+                elif state == "body":
+                    assert part is not None
+                    idx = buffer.find(delimiter)
+                    if idx >= 0:
+                        self._write(part, buffer[:idx])
+                        buffer = buffer[idx + len(delimiter) :]  # noqa
+                        part._finish()
+                        finished, part = part, None
+                        state = "boundary"
+                        yield finished
+                        continue
+                    # keep what could be the start of a delimiter
+                    if len(buffer) > keep:
+                        self._write(part, buffer[:-keep])
+                        buffer = buffer[-keep:]
+
+                chunk = next(chunks, b"")
+                if not chunk:
+                    raise MultipartError("Unexpected end of multipart body")
+                total += len(chunk)
+                if self.max_total_size is not None and total > self.max_total_size:
+                    raise RequestEntityTooLarge(
+                        f"Multipart body exceeds {self.max_total_size} bytes"
+                    )
+                buffer += chunk
+        except BaseException:
+            self._discard(part)
+            raise
+
+    @staticmethod
+    def _parse_headers(data: bytes) -> Dict[str, str]:
+        headers = {}
+        for line in data.decode("UTF-8", errors="replace").split("\r\n"):
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise MultipartError(f"Malformed multipart header: {line!r}")
+            headers[name.strip().lower()] = value.strip()
+        return headers
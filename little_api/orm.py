@@ -1,7 +1,27 @@
+import copy
 import inspect
 import sqlite3
+import threading
+from array import array
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Type
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+)
+
+from little_api.cache import CacheStore, LRUCache
+from little_api.exceptions import StaleInstanceError
 
 SQLITE_TYPE_MAP = {
     int: "INTEGER",
@@ -14,31 +34,125 @@ SQLITE_TYPE_MAP = {
 
 SQLITE_DEFAULT_MAP = {"now": "DEFAULT CURRENT_TIMESTAMP"}
 
+# Foreign key rows remembered while building one result set
+FOREIGN_KEY_CACHE_SIZE = 1024
+
+# Shapes `Database.all`, `Database.get` and `Query.all` can return rows in
+RESULT_MODES = ("instances", "tuples", "dicts", "columns", "arrays", "numpy")
+
+# array.array / numpy types used for columns in the "arrays" and "numpy" modes
+ARRAY_TYPECODE_MAP = {int: "q", bool: "q", float: "d"}
+NUMPY_DTYPE_MAP = {int: "int64", bool: "bool", float: "float64"}
+
+# Per table write counters shared by processes using the same database file
+CACHE_VERSIONS_TABLE = "little_api_cache_versions"
+
+# Lookups usable as `column__<lookup>=value` in `Query.where`
+QUERY_OPERATORS = {
+    "eq": "{column} = ?",
+    "ne": "{column} != ?",
+    "lt": "{column} < ?",
+    "lte": "{column} <= ?",
+    "gt": "{column} > ?",
+    "gte": "{column} >= ?",
+    "like": "{column} LIKE ?",
+    "startswith": "{column} LIKE ? ESCAPE '\\'",
+    "contains": "{column} LIKE ? ESCAPE '\\'",
+    "range": "{column} BETWEEN ? AND ?",
+    "in": "{column} IN ({placeholders})",
+    "isnull": "{column} IS NULL",
+}
+
+
+class TableMeta(type):
+    """Gives every `Table` subclass empty `__slots__` so instances only carry
+    `_column_data`.  Declare `__slots__ = ("__dict__",)` on a subclass to
+    allow arbitrary instance attributes."""
+
+    def __new__(mcs, name, bases, namespace):
+        namespace.setdefault("__slots__", ())
+        return super().__new__(mcs, name, bases, namespace)
+
+
+class Field:
+    """Descriptor storing a value under its attribute name in `_column_data`"""
+
+    name = "id"
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance._column_data.get(self.name)
+
+    def __set__(self, instance, value):
+        column_data = instance._column_data
+        if self.name not in column_data or column_data[self.name] != value:
+            column_data[self.name] = value
+            instance._dirty.add(self.name)
+
+
+class Table(metaclass=TableMeta):
+    __slots__ = ("_column_data", "_dirty")
+    _members: ClassVar[List[Tuple[str, Any]]]
+
+    id = Field()
 
-class Table:
     def __init__(self, **kwargs):
-        self._column_data = {"id": None}
         # stores columns in _column_data
-        for key, value in kwargs.items():
-            self._column_data[key] = value
+        self._column_data = {"id": None, **kwargs}
+        # names of columns changed since the instance was loaded or saved
+        self._dirty = set(kwargs)
+
+    @classmethod
+    def from_row(cls, fields, row):
+        """Builds an instance straight from a row without calling `__init__`"""
+        instance = cls.__new__(cls)
+        instance._column_data = dict(zip(fields, row))
+        instance._dirty = set()
+        return instance
+
+    @property
+    def is_dirty(self) -> bool:
+        return bool(self._dirty - {"id"})
+
+    @classmethod
+    def serializer(cls, fields=None, exclude=None, nested=None, rename=None):
+        """Compiled `Serializer` for the table, see `little_api.serializers`"""
+        from little_api.serializers import Serializer
 
-    def __getattribute__(self, key):
-        # avoid recursion error
-        _column_data = super().__getattribute__("_column_data")
-        if key in _column_data:
-            return _column_data[key]
-        return super().__getattribute__(key)
+        return Serializer(
+            cls, fields=fields, exclude=exclude, nested=nested, rename=rename
+        )
 
-    def __setattr__(self, key, value):
-        super().__setattr__(key, value)
-        if key in self._column_data:
-            self._column_data[key] = value
+    @classmethod
+    def get_version_column(cls) -> Optional[str]:
+        """Name of the column used for optimistic concurrency, if any"""
+        for name, field in cls.get_members():
+            if isinstance(field, Column) and field.version:
+                return name
+        return None
+
+    @classmethod
+    def get_members(cls) -> List[Tuple[str, Any]]:
+        """Columns, foreign keys and indexes declared on the class, by name"""
+        members = cls.__dict__.get("_members")
+        if members is None:
+            members = [
+                (name, field)
+                for name, field in inspect.getmembers(cls)
+                if isinstance(field, (Column, ForeignKey, Index))
+            ]
+            cls._members = members
+        return members
 
     @classmethod
     def get_create_sql(cls):
         create_sql = "CREATE TABLE IF NOT EXISTS {name} ({fields});"
         fields = ["id INTEGER PRIMARY KEY AUTOINCREMENT"]
-        for name, field in inspect.getmembers(cls):
+        for name, field in cls.get_members():
             if isinstance(field, Column):
                 column_statement = f"{name} {field.sql_type}"
                 if field.default is not None:
@@ -50,6 +164,73 @@ class Table:
         name = cls.__name__.lower()
         return create_sql.format(name=name, fields=fields)
 
+    @classmethod
+    def get_index_sql(cls) -> List[str]:
+        """CREATE INDEX statements for indexed columns, foreign keys and
+        `Index` declarations on the class"""
+        index_sql = "CREATE {unique}INDEX IF NOT EXISTS {index} ON {name} ({columns});"
+        name = cls.__name__.lower()
+        indexes = []
+        for attr, field in cls.get_members():
+            if isinstance(field, Column) and (field.index or field.unique):
+                indexes.append((attr, [attr], field.unique))
+            elif isinstance(field, ForeignKey):
+                indexes.append((f"{attr}_id", [f"{attr}_id"], False))
+            elif isinstance(field, Index):
+                columns = []
+                for column in field.columns:
+                    if isinstance(getattr(cls, column, None), ForeignKey):
+                        column = f"{column}_id"
+                    columns.append(column)
+                indexes.append((attr, columns, field.unique))
+        statements = []
+        for attr, columns, unique in indexes:
+            statements.append(
+                index_sql.format(
+                    unique="UNIQUE " if unique else "",
+                    index=f"{'ux' if unique else 'ix'}_{name}_{attr}",
+                    name=name,
+                    columns=", ".join(columns),
+                )
+            )
+        return statements
+
+    @classmethod
+    def get_full_text_columns(cls) -> List[str]:
+        return [
+            name
+            for name, field in cls.get_members()
+            if isinstance(field, Column) and field.full_text
+        ]
+
+    @classmethod
+    def get_full_text_sql(cls) -> List[str]:
+        """FTS5 table indexing the full text columns of the table and the
+        triggers keeping it in sync"""
+        columns = cls.get_full_text_columns()
+        if not columns:
+            return []
+        name = cls.__name__.lower()
+        fts = f"{name}_fts"
+        fields = ", ".join(columns)
+        new = ", ".join(f"new.{column}" for column in columns)
+        old = ", ".join(f"old.{column}" for column in columns)
+        insert = f"INSERT INTO {fts} (rowid, {fields}) VALUES (new.id, {new});"
+        delete = (
+            f"INSERT INTO {fts} ({fts}, rowid, {fields}) "
+            f"VALUES ('delete', old.id, {old});"
+        )
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({fields}, "
+            f"content='{name}', content_rowid='id');",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {name} "
+            f"BEGIN {insert} END;",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {name} "
+            f"BEGIN {delete} END;",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {fields} "
+            f"ON {name} BEGIN {delete} {insert} END;",
+        ]
+
     def get_insert_sql(self):
         insert_sql = "INSERT INTO {name} ({fields}) VALUES ({placeholders});"
         cls = self.__class__
@@ -57,7 +238,7 @@ class Table:
         placeholders = []
         values = []
         # Get column definitions off of class
-        for name, field in inspect.getmembers(cls):
+        for name, field in cls.get_members():
             if isinstance(field, Column):
                 # Get values off of instance if not None
                 if getattr(self, name) is not None:
@@ -66,7 +247,7 @@ class Table:
                     placeholders.append("?")
             elif isinstance(field, ForeignKey):
                 fields.append(name + "_id")
-                values.append(getattr(self, name).id)
+                values.append(getattr(getattr(self, name), "id", None))
                 placeholders.append("?")
         fields = ", ".join(fields)
         placeholders = ", ".join(placeholders)
@@ -76,23 +257,36 @@ class Table:
         )
         return sql, values
 
-    def get_update_sql(self):
+    def get_update_sql(self, fields: Optional[Iterable[str]] = None):
+        """UPDATE for the changed columns (or `fields`), guarded by the
+        version column when the table has one"""
         sql = "UPDATE {name} SET {fields} WHERE id = ?"
         cls = self.__class__
-        fields = []
+        if fields is None:
+            fields = self._dirty
+        version = cls.get_version_column()
+        columns = []
         values = []
-        for name, field in inspect.getmembers(cls):
-            if isinstance(field, Column) and field != "id":
-                fields.append(name)
+        for name, field in cls.get_members():
+            if name not in fields or name in ("id", version):
+                continue
+            if isinstance(field, Column):
+                columns.append(name)
                 values.append(getattr(self, name))
             if isinstance(field, ForeignKey):
-                fields.append(f"{name}_id")
-                values.append(getattr(self, name).id)
+                columns.append(f"{name}_id")
+                values.append(getattr(getattr(self, name), "id", None))
+        if version is not None:
+            columns.append(version)
+            values.append((getattr(self, version) or 0) + 1)
+            sql += f" AND {version} = ?"
         values.append(getattr(self, "id"))
+        if version is not None:
+            values.append(getattr(self, version))
 
         sql = sql.format(
             name=cls.__name__.lower(),
-            fields=", ".join([f"{field} = ?" for field in fields]),
+            fields=", ".join([f"{column} = ?" for column in columns]),
         )
         return sql, values
 
@@ -101,7 +295,7 @@ class Table:
         select_sql = "SELECT {fields} FROM {name};"
         table_name = cls.__name__.lower()
         fields = ["id"]
-        for name, field in inspect.getmembers(cls):
+        for name, field in cls.get_members():
             if isinstance(field, Column):
                 fields.append(name)
             if isinstance(field, ForeignKey):
@@ -125,10 +319,24 @@ class Table:
         return sql, fields, values
 
 
-class Column:
-    def __init__(self, column_type, default=None):
+class Column(Field):
+    def __init__(
+        self,
+        column_type,
+        default=None,
+        index=False,
+        unique=False,
+        version=False,
+        full_text=False,
+    ):
         self.type = column_type
         self._default = default
+        self.index = index
+        self.unique = unique
+        # full text columns are indexed in a FTS5 table, see `Database.search`
+        self.full_text = full_text
+        # version columns are bumped on every update and checked against the row
+        self.version = version
 
     @property
     def sql_type(self):
@@ -139,17 +347,498 @@ class Column:
         return SQLITE_DEFAULT_MAP.get(self._default)
 
 
-class ForeignKey:
-    def __init__(self, table: Table):
+class ForeignKey(Field):
+    def __init__(self, table: Type[Table]):
+        self.table = table
+
+
+class Index:
+    """Composite index declared on a table, e.g. `by_name = Index("last", "first")`"""
+
+    def __init__(self, *columns: str, unique: bool = False):
+        self.columns = columns
+        self.unique = unique
+
+
+AGGREGATE_FUNCTIONS = {
+    "count": "COUNT",
+    "sum": "SUM",
+    "avg": "AVG",
+    "min": "MIN",
+    "max": "MAX",
+}
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fts_terms(text: str) -> str:
+    """Plain text as a FTS5 query, each word quoted as a string"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+class Query:
+    """Chainable, parameterised SELECT for a table.
+
+    e.g. `db.query(User).where(age__gte=18).order_by("-id").limit(50).all()`
+    """
+
+    def __init__(self, db: "Database", table: Type[Table]):
+        self.db = db
         self.table = table
+        _, self._fields = table.get_select_all_sql()
+        self._where: List[Tuple[str, List]] = []
+        self._order_by: List[Tuple[str, bool]] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+        self._after: Optional[Tuple] = None
+        self._only: Optional[List[str]] = None
+
+    def _clone(self) -> "Query":
+        query = copy.copy(self)
+        query._where = list(self._where)
+        query._order_by = list(self._order_by)
+        return query
+
+    def bind(self, db: "Database") -> "Query":
+        """Copy of the query running against another database connection"""
+        query = self._clone()
+        query.db = db
+        return query
+
+    def _column(self, name: str) -> str:
+        """Resolves a column or foreign key name to its sql column"""
+        if name in self._fields:
+            return name
+        if f"{name}_id" in self._fields:
+            return f"{name}_id"
+        raise ValueError(f"Unknown column for {self.table.__name__}: {name}")
+
+    @staticmethod
+    def _value(value):
+        # Foreign keys can be filtered on with instances
+        return value.id if isinstance(value, Table) else value
+
+    def where(self, **kwargs) -> "Query":
+        """Adds filters joined by AND, e.g. `where(name="Bob", age__lt=30)`"""
+        query = self._clone()
+        for key, value in kwargs.items():
+            name, _, lookup = key.partition("__")
+            lookup = lookup or "eq"
+            if lookup not in QUERY_OPERATORS:
+                raise ValueError(f"Unknown lookup: {lookup}")
+            column = self._column(name)
+            template = QUERY_OPERATORS[lookup]
+            if lookup == "in":
+                values = [self._value(v) for v in value]
+                if not values:
+                    # Nothing can match an empty IN
+                    query._where.append(("0", []))
+                    continue
+                placeholders = ", ".join("?" * len(values))
+                clause = template.format(column=column, placeholders=placeholders)
+            elif lookup == "range":
+                low, high = value
+                clause, values = template.format(column=column), [low, high]
+            elif lookup == "isnull":
+                clause, values = template.format(column=column), []
+                if not value:
+                    clause = f"{column} IS NOT NULL"
+            elif lookup == "eq" and value is None:
+                clause, values = f"{column} IS NULL", []
+            elif lookup == "startswith":
+                clause, values = template.format(column=column), [
+                    _escape_like(value) + "%"
+                ]
+            elif lookup == "contains":
+                clause, values = template.format(column=column), [
+                    "%" + _escape_like(value) + "%"
+                ]
+            else:
+                clause, values = template.format(column=column), [self._value(value)]
+            query._where.append((clause, values))
+        return query
+
+    def order_by(self, *columns: str) -> "Query":
+        """Orders by columns, prefix a column with `-` for descending"""
+        query = self._clone()
+        for column in columns:
+            descending = column.startswith("-")
+            query._order_by.append((self._column(column.lstrip("-")), descending))
+        return query
+
+    def limit(self, limit: int) -> "Query":
+        query = self._clone()
+        query._limit = int(limit)
+        return query
+
+    def offset(self, offset: int) -> "Query":
+        query = self._clone()
+        query._offset = int(offset)
+        return query
+
+    def after(self, *values) -> "Query":
+        """Keyset pagination, rows strictly after `values` in `order_by` order.
+
+        With no `order_by` the query is ordered by id, so
+        `query.after(last_id)` fetches the next page.
+        """
+        query = self._clone()
+        query._after = values
+        return query
+
+    def only(self, *columns: str) -> "Query":
+        """Restricts the selected columns, unselected columns stay unset.
+        Instances loaded without "id" can't be saved or updated."""
+        query = self._clone()
+        query._only = [self._column(column) for column in columns]
+        return query
+
+    def _render(
+        self, select: str, group_by: Optional[List[str]] = None
+    ) -> Tuple[str, List]:
+        """Renders `SELECT <select>` with the query's filters and paging"""
+        order_by = self._order_by or [("id", False)]
+        clauses = [clause for clause, _ in self._where]
+        values = [value for _, clause_values in self._where for value in clause_values]
+        if self._after is not None:
+            if len(self._after) != len(order_by):
+                raise ValueError("after() needs one value per order_by column")
+            if len({descending for _, descending in order_by}) > 1:
+                raise ValueError("after() needs all order_by columns in one direction")
+            columns = ", ".join(column for column, _ in order_by)
+            placeholders = ", ".join("?" * len(order_by))
+            operator = "<" if order_by[0][1] else ">"
+            clauses.append(f"({columns}) {operator} ({placeholders})")
+            values.extend(self._value(value) for value in self._after)
+
+        sql = f"SELECT {select} FROM {self.table.__name__.lower()}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if group_by:
+            sql += " GROUP BY " + ", ".join(group_by)
+        if self._order_by or self._after is not None:
+            sql += " ORDER BY " + ", ".join(
+                f"{column} DESC" if descending else column
+                for column, descending in order_by
+            )
+        if self._limit is not None or self._offset is not None:
+            sql += " LIMIT ?"
+            values.append(-1 if self._limit is None else self._limit)
+        if self._offset is not None:
+            sql += " OFFSET ?"
+            values.append(self._offset)
+        return sql, values
+
+    def sql(self) -> Tuple[str, List[str], List]:
+        """Renders the query into sql, selected fields and parameters"""
+        fields = self._only or self._fields
+        sql, values = self._render(", ".join(fields))
+        return sql + ";", list(fields), values
+
+    def _aggregate(self, function: str, column: str) -> str:
+        if function not in AGGREGATE_FUNCTIONS:
+            raise ValueError(f"Unknown aggregate: {function}")
+        if column != "*":
+            column = self._column(column)
+        elif function != "count":
+            raise ValueError(f"{function} needs a column")
+        return f"{AGGREGATE_FUNCTIONS[function]}({column})"
+
+    def _scalar(self, expression: str):
+        if self._limit is None and self._offset is None and self._after is None:
+            query = self._clone()
+            query._order_by = []
+            sql, values = query._render(expression)
+        else:
+            # aggregate over the page rather than the whole table
+            sql, values = self._render("*")
+            sql = f"SELECT {expression} FROM ({sql})"
+        return self.db.fetch_all(self.table, sql + ";", values)[0][0]
+
+    def count(self, column: str = "*") -> int:
+        """Number of matching rows, or of non null values of `column`"""
+        return self._scalar(self._aggregate("count", column))
+
+    def exists(self) -> bool:
+        sql, values = self.limit(1)._render("1")
+        return bool(
+            self.db.fetch_all(self.table, f"SELECT EXISTS({sql});", values)[0][0]
+        )
+
+    def sum(self, column: str):
+        return self._scalar(self._aggregate("sum", column))
+
+    def avg(self, column: str):
+        return self._scalar(self._aggregate("avg", column))
+
+    def min(self, column: str):
+        return self._scalar(self._aggregate("min", column))
+
+    def max(self, column: str):
+        return self._scalar(self._aggregate("max", column))
+
+    def group_by(self, *columns: str, **aggregates: Tuple[str, str]) -> List[Tuple]:
+        """Groups matching rows, returning a tuple per group of the group
+        columns followed by each aggregate, e.g.
+        `group_by("author", books=("count", "*"), pages=("sum", "pages"))`
+        """
+        group_by = [self._column(column) for column in columns]
+        # rows come back as tuples, so the names aren't used as sql aliases
+        # and may be keywords, e.g. `order`
+        select = group_by + [
+            self._aggregate(function, column)
+            for function, column in aggregates.values()
+        ]
+        query = self._clone()
+        if not self._order_by and self._after is None:
+            query._order_by = [(column, False) for column in group_by]
+        sql, values = query._render(", ".join(select), group_by=group_by)
+        return self.db.fetch_all(self.table, sql + ";", values)
+
+    def __iter__(self) -> Iterator:
+        return self.iter()
+
+    def iter(self, batch_size: int = 500) -> Iterator:
+        sql, fields, values = self.sql()
+        build = self.db.row_factory(fields, self.table)
+        for row in self.db.fetch_rows(sql, values, batch_size):
+            yield build(row)
+
+    def all(self, mode: str = "instances"):
+        """Runs the query, see `Database.build_results` for the modes"""
+        sql, fields, values = self.sql()
+        rows = self.db.fetch_all(self.table, sql, values)
+        return self.db.build_results(rows, fields, self.table, mode)
+
+    def first(self):
+        instances = self.limit(1).all()
+        return instances[0] if instances else None
+
+    def explain(self) -> List[str]:
+        return self.db.explain(self)
+
+
+class QueryCache:
+    """Opt-in cache of query rows keyed by table, sql and parameters.
+
+    Writes through `Database` bump the table's generation, so entries cached
+    before the write are never read again and simply age out of the LRU.
+    With `shared=True` writes also bump a counter stored in the database and
+    `Database.sync_cache` drops tables written by other processes.  Entries
+    are then keyed by that counter, so a `store` shared between processes,
+    e.g. a `SQLiteCache`, serves every worker.  A `store` therefore requires
+    `shared=True`, per-process generations would collide across workers.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        shared: bool = False,
+        store: Optional[CacheStore] = None,
+    ):
+        if store is not None and not shared:
+            raise ValueError("QueryCache with a store requires shared=True")
+        self.entries = LRUCache(maxsize, ttl) if store is None else store
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self._generations: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}
+
+    def key(self, table: str, sql: str, values) -> Tuple:
+        if self.shared:
+            return table, self._versions.get(table, 0), sql, tuple(values)
+        return table, self._generations.get(table, 0), sql, tuple(values)
+
+    def get(self, key: Tuple) -> Optional[List]:
+        rows = self.entries.get(key)
+        if rows is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return rows
+
+    def set(self, key: Tuple, rows: List) -> None:
+        self.entries.set(key, rows)
+
+    def invalidate(self, table: str) -> None:
+        self._generations[table] = self._generations.get(table, 0) + 1
+
+    def sync(self, versions: Dict[str, int]) -> None:
+        """Invalidates tables whose stored write counter has moved"""
+        for table, version in versions.items():
+            if self._versions.get(table) != version:
+                self._versions[table] = version
+                self.invalidate(table)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+class _ConnectionState(threading.local):
+    """A thread's connection and the state of its open transaction"""
+
+    def __init__(self):
+        self.conn: Optional[sqlite3.Connection] = None
+        self.transaction_depth = 0
+        self.undo: List[Tuple[Table, Dict, Set]] = []
+        # tables written in the open transaction and their new shared write
+        # counter, invalidated once committed
+        self.touched: Dict[str, Optional[int]] = {}
 
 
 class Database:
-    def __init__(self, path: str):
-        self.conn = sqlite3.Connection(path)
+    """A sqlite database.  Each thread using a file database gets its own
+    connection, e.g. the handler threads of `little-api serve --threads`.
+    An in-memory database only exists on its one connection, which sqlite
+    restricts to the creating thread unless `check_same_thread` is False."""
+
+    def __init__(
+        self,
+        path: str,
+        cache: Optional[QueryCache] = None,
+        check_same_thread: bool = True,
+    ):
+        self.path = path
+        self.cache = cache
+        # sqlite's check that the connection is only used by its own thread
+        self.check_same_thread = check_same_thread
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        if self.path == ":memory:":
+            # every thread shares the single connection and its transaction
+            self._state = _ConnectionState()
+            self._state.conn = self._open()
+        else:
+            self._state = _ConnectionState()
+            # open the creating thread's connection now, surfacing errors early
+            self.conn
+
+    def _open(self) -> sqlite3.Connection:
+        # per-thread connections are only used by their own thread, but
+        # closed by whichever one calls `close`
+        conn = sqlite3.Connection(
+            self.path,
+            check_same_thread=self.check_same_thread and self.path == ":memory:",
+        )
+        with self._connections_lock:
+            self._connections.append(conn)
+        if self.cache is not None and self.cache.shared:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {CACHE_VERSIONS_TABLE} "
+                "(name TEXT PRIMARY KEY, version INTEGER NOT NULL);"
+            )
+            rows = conn.execute(f"SELECT name, version FROM {CACHE_VERSIONS_TABLE};")
+            self.cache.sync(dict(rows.fetchall()))
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        state = self._state
+        if state.conn is None:
+            state.conn = self._open()
+        return state.conn
+
+    @property
+    def _transaction_depth(self) -> int:
+        return self._state.transaction_depth
+
+    @_transaction_depth.setter
+    def _transaction_depth(self, depth: int) -> None:
+        self._state.transaction_depth = depth
+
+    @property
+    def _undo(self) -> List[Tuple[Table, Dict, Set]]:
+        return self._state.undo
+
+    @property
+    def _touched(self) -> Dict[str, Optional[int]]:
+        return self._state.touched
+
+    def close(self) -> None:
+        """Closes every thread's connection, e.g. from `API.on_shutdown`"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+    def reopen(self) -> None:
+        """Replaces the connections with new ones.  sqlite connections must
+        not be used across a fork, so forked workers should call this before
+        their first query, e.g. from `API.on_worker_init`.  An in-memory
+        database comes back empty."""
+        self.close()
+        self._reset()
+
+    def _touch(self, table: Type[Table]) -> None:
+        """Invalidates cached reads of a table written in the open transaction.
+        The cache is only invalidated after the commit, otherwise a reader on
+        another connection could cache the old rows under the new generation,
+        or a rolled back shared counter be taken as the version of the rows."""
+        if self.cache is None:
+            return
+        name = table.__name__.lower()
+        version = None
+        if self.cache.shared:
+            self.conn.execute(
+                f"INSERT INTO {CACHE_VERSIONS_TABLE} (name, version) VALUES (?, 1) "
+                "ON CONFLICT (name) DO UPDATE SET version = version + 1;",
+                (name,),
+            )
+            (version,) = self.conn.execute(
+                f"SELECT version FROM {CACHE_VERSIONS_TABLE} WHERE name = ?;",
+                (name,),
+            ).fetchone()
+        self._touched[name] = version
+
+    def _invalidate_touched(self) -> None:
+        touched, self._state.touched = self._touched, {}
+        if self.cache is not None:
+            for name, version in touched.items():
+                if version is None:
+                    self.cache.invalidate(name)
+                else:
+                    self.cache.sync({name: version})
+
+    def sync_cache(self) -> None:
+        """Drops cached reads of tables written by other processes sharing the
+        database, e.g. call it from `API.before_request`"""
+        if self.cache is None or not self.cache.shared:
+            return
+        rows = self.conn.execute(f"SELECT name, version FROM {CACHE_VERSIONS_TABLE};")
+        self.cache.sync(dict(rows.fetchall()))
 
     def create(self, table: Type[Table]):
-        self.conn.execute(table.get_create_sql())
+        """Creates the table, its indexes and full text index.  Inside a
+        transaction these are committed with it."""
+        with self.transaction():
+            self.conn.execute(table.get_create_sql())
+            for sql in table.get_index_sql():
+                self.conn.execute(sql)
+            full_text_sql = table.get_full_text_sql()
+            if full_text_sql:
+                fts = f"{table.__name__.lower()}_fts"
+                existing = fts in self.tables
+                for sql in full_text_sql:
+                    self.conn.execute(sql)
+                if not existing:
+                    # index rows saved before full text search was enabled
+                    self.conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild');")
+
+    def explain(self, query) -> List[str]:
+        """Returns the `EXPLAIN QUERY PLAN` details for a `Query` or (sql, values)"""
+        if isinstance(query, Query):
+            sql, _, values = query.sql()
+        else:
+            sql, values = query
+        rows = self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", tuple(values))
+        return [row[-1] for row in rows]
 
     @property
     def tables(self) -> List[Table]:
@@ -158,46 +847,326 @@ class Database:
         ).fetchall()
         return [row[0] for row in rows]
 
-    def save(self, instance: Table) -> None:
+    @contextmanager
+    def transaction(self) -> Iterator["Database"]:
+        """Groups writes into a single commit.  If anything raises the writes
+        are rolled back and the saved/updated instances restored.  Nested
+        transactions join the outermost one."""
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if not self._transaction_depth:
+                self.conn.rollback()
+                for instance, column_data, dirty in reversed(self._undo):
+                    instance._column_data = column_data
+                    instance._dirty = dirty
+                self._undo.clear()
+                self._touched.clear()
+            raise
+        self._transaction_depth -= 1
+        if not self._transaction_depth:
+            self.conn.commit()
+            self._undo.clear()
+            self._invalidate_touched()
+
+    def _remember(self, instance: Table) -> None:
+        """Keeps the instance's state to restore if the transaction rolls back"""
+        self._undo.append((instance, dict(instance._column_data), set(instance._dirty)))
+
+    @staticmethod
+    def _check_has_id(instance: Table) -> None:
+        # rows loaded by `Query.only` without "id" can't be written back
+        if "id" not in instance._column_data:
+            raise ValueError(
+                f"{instance.__class__.__name__} was loaded without its id, "
+                'include "id" in Query.only() to save or update it'
+            )
+
+    def _insert(self, instance: Table) -> None:
+        self._check_has_id(instance)
+        self._remember(instance)
+        version = instance.get_version_column()
+        if version is not None and getattr(instance, version) is None:
+            instance._column_data[version] = 1
         sql, values = instance.get_insert_sql()
         result = self.conn.execute(sql, values)
         instance._column_data["id"] = result.lastrowid
-        self.conn.commit()
+        instance._dirty.clear()
+
+    def save(self, instance: Table) -> None:
+        with self.transaction():
+            self._insert(instance)
+            self._touch(type(instance))
+
+    def save_many(self, instances: Iterable[Table]) -> None:
+        """Saves instances in a single transaction"""
+        with self.transaction():
+            tables = set()
+            for instance in instances:
+                self._insert(instance)
+                tables.add(type(instance))
+            for table in tables:
+                self._touch(table)
 
     def update(self, instance: Table) -> None:
-        sql, values = instance.get_update_sql()
-        self.conn.execute(sql, values)
-        self.conn.commit()
+        """Writes the columns changed since the instance was loaded or saved.
+
+        Raises `StaleInstanceError` when the table has a version column and
+        the row was updated elsewhere since this instance was read.
+        """
+        self._check_has_id(instance)
+        if not instance.is_dirty:
+            return
+        with self.transaction():
+            self._remember(instance)
+            sql, values = instance.get_update_sql()
+            result = self.conn.execute(sql, values)
+            version = instance.get_version_column()
+            if version is not None:
+                if result.rowcount == 0:
+                    raise StaleInstanceError(
+                        f"{instance.__class__.__name__} {instance.id} was modified"
+                    )
+                instance._column_data[version] = getattr(instance, version) + 1
+            self._touch(type(instance))
+            instance._dirty.clear()
+
+    def row_factory(self, fields, table) -> Callable:
+        """Returns a function turning a row with `fields` into a `table` instance.
+        Foreign keys are resolved once per referenced row."""
+        fields = list(fields)
+        foreign_keys = []
+        for idx, field in enumerate(fields):
+            fk = getattr(table, field[:-3], None) if field.endswith("_id") else None
+            if isinstance(fk, ForeignKey):
+                fields[idx] = field[:-3]
+                foreign_keys.append((fields[idx], fk.table))
+        if not foreign_keys:
+            return partial(table.from_row, fields)
+
+        resolved: Dict = {}
+
+        def build(row):
+            instance = table.from_row(fields, row)
+            column_data = instance._column_data
+            for name, fk_table in foreign_keys:
+                key = (fk_table, column_data[name])
+                if key not in resolved:
+                    if len(resolved) >= FOREIGN_KEY_CACHE_SIZE:
+                        resolved.clear()
+                    related = self.get(fk_table, id=key[1]) if key[1] else []
+                    resolved[key] = related[0] if related else None
+                column_data[name] = resolved[key]
+            return instance
+
+        return build
 
     def generate_instances(self, rows, fields, table):
-        instances = []
-        for row in rows:
-            instance = table()
-            for field, value in zip(fields, row):
-                # If foreign key create instance for it
-                if "_id" in field:
-                    field = field[:-3]
-                    # Get column off class
-                    fk = getattr(table, field)
-                    value = self.get(fk.table, id=value)[0]
-                setattr(instance, field, value)
-            instances.append(instance)
-        return instances
-
-    def all(self, table: Type[Table]) -> List:
+        return list(map(self.row_factory(fields, table), rows))
+
+    def fetch_all(self, table: Type[Table], sql: str, values=()) -> List:
+        """Runs a query for `table`, going through the query cache if enabled"""
+        if self.cache is None or self._transaction_depth:
+            # rows read inside a transaction may be rolled back
+            return self.conn.execute(sql, tuple(values)).fetchall()
+        key = self.cache.key(table.__name__.lower(), sql, values)
+        rows = self.cache.get(key)
+        if rows is None:
+            rows = self.conn.execute(sql, tuple(values)).fetchall()
+            self.cache.set(key, rows)
+        return rows
+
+    def fetch_rows(self, sql: str, values=(), batch_size: int = 500) -> Iterator:
+        """Yields rows for a query, pulling `batch_size` rows at a time"""
+        cursor = self.conn.execute(sql, tuple(values))
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def build_results(self, rows: List, fields: List[str], table, mode: str):
+        """Shapes rows for `mode`:
+
+        - instances: list of `table` instances
+        - tuples: list of row tuples
+        - dicts: list of dicts keyed by column name
+        - columns: dict of column name to list of values
+        - arrays: like columns, with `array.array`s for int/float columns
+        - numpy: like columns, with numpy arrays (requires numpy)
+
+        Foreign keys are only resolved to instances in the instances mode,
+        other modes return their `<name>_id` value.
+        """
+        if mode == "instances":
+            return self.generate_instances(rows, fields, table)
+        if mode == "tuples":
+            return list(rows)
+        if mode == "dicts":
+            return [dict(zip(fields, row)) for row in rows]
+        if mode not in RESULT_MODES:
+            raise ValueError(f"Unknown result mode: {mode}")
+
+        columns = list(zip(*rows)) or [()] * len(fields)
+        if mode == "columns":
+            return {field: list(values) for field, values in zip(fields, columns)}
+        if mode == "arrays":
+            results: Dict[str, Any] = {}
+            for field, values in zip(fields, columns):
+                typecode = ARRAY_TYPECODE_MAP.get(self._field_type(table, field))
+                results[field] = list(values)
+                if typecode is not None:
+                    try:
+                        results[field] = array(typecode, values)
+                    except (TypeError, OverflowError):
+                        # NULLs or out of range values can't go in an array
+                        pass
+            return results
+
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("The numpy result mode requires numpy to be installed")
+        results = {}
+        for field, values in zip(fields, columns):
+            dtype = NUMPY_DTYPE_MAP.get(self._field_type(table, field), object)
+            if None in values:
+                # bool would turn NULLs into False and float into nan
+                dtype = object
+            try:
+                results[field] = numpy.array(values, dtype=dtype)
+            except (TypeError, ValueError, OverflowError):
+                results[field] = numpy.array(values, dtype=object)
+        return results
+
+    @staticmethod
+    def _field_type(table: Type[Table], field: str):
+        if field == "id" or isinstance(getattr(table, field[:-3], None), ForeignKey):
+            return int
+        column = getattr(table, field, None)
+        return column.type if isinstance(column, Column) else None
+
+    def all(self, table: Type[Table], mode: str = "instances"):
         sql, fields = table.get_select_all_sql()
-        rows = self.conn.execute(sql).fetchall()
-        instances = self.generate_instances(rows, fields, table)
-        return instances
+        rows = self.fetch_all(table, sql)
+        return self.build_results(rows, fields, table, mode)
+
+    def get(self, table, mode: str = "instances", **kwargs):
+        """Rows matching equality filters, in a result mode from `build_results`.
+        A column named `mode` has to be filtered on with `Database.query`."""
+        sql, fields, values = table.get_filtered_select(**kwargs)
+        rows = self.fetch_all(table, sql, values)
+        return self.build_results(rows, fields, table, mode)
+
+    def query(self, table: Type[Table]) -> Query:
+        return Query(self, table)
+
+    def search(
+        self,
+        table: Type[Table],
+        query: str,
+        limit: int = 20,
+        snippet: Optional[str] = None,
+        snippet_tokens: int = 10,
+        raw: bool = False,
+    ) -> List:
+        """Full text search over the table's `full_text` columns, best bm25
+        matches first.  Rows must match every word of `query`, which is taken
+        as plain text.  With `raw` it is passed on as a FTS5 query, e.g.
+        `title:sqlite OR "exact phrase"`, and a malformed one raises
+        ValueError.
+
+        With `snippet` set to a full text column returns (instance, snippet)
+        pairs, the matched terms wrapped in <b></b>.
+        """
+        columns = table.get_full_text_columns()
+        if not columns:
+            raise ValueError(f"{table.__name__} has no full text columns")
+        if not raw:
+            query = _fts_terms(query)
+            if not query:
+                return []
+        name = table.__name__.lower()
+        fts = f"{name}_fts"
+        _, fields = table.get_select_all_sql()
+        select = ", ".join(f"{name}.{field}" for field in fields)
+        values: List[Any] = [query, limit]
+        if snippet is not None:
+            if snippet not in columns:
+                raise ValueError(f"{snippet} is not a full text column")
+            select += f", snippet({fts}, ?, '<b>', '</b>', '...', ?)"
+            values[:0] = [columns.index(snippet), snippet_tokens]
+        sql = (
+            f"SELECT {select} FROM {fts} JOIN {name} ON {name}.id = {fts}.rowid "
+            f"WHERE {fts} MATCH ? ORDER BY bm25({fts}) LIMIT ?;"
+        )
+        try:
+            rows = self.fetch_all(table, sql, values)
+        except sqlite3.OperationalError as e:
+            if not raw:
+                raise
+            raise ValueError(f"Invalid full text query {query!r}: {e}") from None
+        if snippet is None:
+            return self.generate_instances(rows, fields, table)
+        instances = self.generate_instances([row[:-1] for row in rows], fields, table)
+        return list(zip(instances, [row[-1] for row in rows]))
 
-    def get(self, table, **kwargs):
+    def count(self, table: Type[Table], **kwargs) -> int:
+        return self.query(table).where(**kwargs).count()
+
+    def exists(self, table: Type[Table], **kwargs) -> bool:
+        return self.query(table).where(**kwargs).exists()
+
+    def sum(self, table: Type[Table], column: str, **kwargs):
+        return self.query(table).where(**kwargs).sum(column)
+
+    def avg(self, table: Type[Table], column: str, **kwargs):
+        return self.query(table).where(**kwargs).avg(column)
+
+    def min(self, table: Type[Table], column: str, **kwargs):
+        return self.query(table).where(**kwargs).min(column)
+
+    def max(self, table: Type[Table], column: str, **kwargs):
+        return self.query(table).where(**kwargs).max(column)
+
+    def group_by(
+        self, table: Type[Table], *columns: str, **aggregates: Tuple[str, str]
+    ) -> List[Tuple]:
+        """See `Query.group_by`"""
+        return self.query(table).group_by(*columns, **aggregates)
+
+    def iter(self, table: Type[Table], batch_size: int = 500, **kwargs) -> Iterator:
+        """Lazily yields instances matching the filters, see `Database.get`"""
         sql, fields, values = table.get_filtered_select(**kwargs)
-        rows = self.conn.execute(sql, tuple(values)).fetchall()
-        instances = self.generate_instances(rows, fields, table)
-        return instances
+        build = self.row_factory(fields, table)
+        for row in self.fetch_rows(sql, values, batch_size):
+            yield build(row)
+
+    def iter_raw(
+        self,
+        table: Type[Table],
+        batch_size: int = 500,
+        as_dict: bool = False,
+        **kwargs: Any,
+    ) -> Iterator:
+        """Lazily yields rows as tuples (or dicts keyed by column name).
+        Foreign keys are returned as their `<name>_id` value."""
+        sql, fields, values = table.get_filtered_select(**kwargs)
+        rows = self.fetch_rows(sql, values, batch_size)
+        if not as_dict:
+            yield from rows
+            return
+        for row in rows:
+            yield dict(zip(fields, row))
 
     def delete(self, instance: Table):
         sql = f"DELETE from {instance.__class__.__name__.lower()} where id = ?"
         values = [instance.id]
-        self.conn.execute(sql, values)
-        self.conn.commit()
+        with self.transaction():
+            self.conn.execute(sql, values)
+            self._touch(type(instance))
@@ -0,0 +1,282 @@
+import io
+import json
+from collections.abc import Mapping
+from functools import cached_property
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote, unquote
+
+from little_api.exceptions import MultipartError, RequestEntityTooLarge
+from little_api.multipart import (
+    SPOOL_THRESHOLD,
+    Destination,
+    MultipartParser,
+    Part,
+    parse_options_header,
+)
+
+PATH_SAFE = "/~!$&'()*+,;=:@"
+READ_CHUNK_SIZE = 64 * 1024
+
+# headers the WSGI environ stores without the HTTP_ prefix
+UNPREFIXED_HEADERS = {"CONTENT_TYPE", "CONTENT_LENGTH"}
+
+
+def _environ_key(name: str) -> str:
+    key = name.upper().replace("-", "_")
+    return key if key in UNPREFIXED_HEADERS else f"HTTP_{key}"
+
+
+def _wsgi_bytes(value: str) -> bytes:
+    """Bytes of a PEP 3333 environ string, which holds latin-1 code points"""
+    try:
+        return value.encode("latin-1")
+    except UnicodeEncodeError:
+        return value.encode("UTF-8")
+
+
+class MultiDict(dict):
+    """Dict of the last value for each key, `getall` returns every value"""
+
+    def __init__(self, items: List[Tuple[str, Any]]):
+        super().__init__(items)
+        self._items = items
+
+    def getall(self, key: str) -> List[Any]:
+        return [value for name, value in self._items if name == key]
+
+    def items_all(self) -> List[Tuple[str, Any]]:
+        return list(self._items)
+
+
+class EnvironHeaders(Mapping):
+    """Case-insensitive read-only view of the headers in a WSGI environ"""
+
+    def __init__(self, environ: Dict):
+        self.environ = environ
+
+    def __getitem__(self, name: str) -> str:
+        return self.environ[_environ_key(name)]
+
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and _environ_key(name) in self.environ
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.environ:
+            if key.startswith("HTTP_"):
+                yield key[5:].replace("_", "-").title()
+            elif key in UNPREFIXED_HEADERS:
+                yield key.replace("_", "-").title()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class Request:
+    """The incoming request, a thin view over the WSGI environ.
+
+    Headers, query string, cookies, body and JSON are parsed on first access
+    and cached.  Bodies larger than `max_body_size` raise
+    `RequestEntityTooLarge` before anything is read.  `webob` gives a
+    `webob.Request` for the same environ when more is needed.
+    """
+
+    def __init__(self, environ: Dict, max_body_size: Optional[int] = None):
+        self.environ = environ
+        self.max_body_size = max_body_size
+
+    @property
+    def method(self) -> str:
+        return self.environ["REQUEST_METHOD"].upper()
+
+    @property
+    def scheme(self) -> str:
+        return self.environ.get("wsgi.url_scheme", "http")
+
+    @cached_property
+    def path_info(self) -> str:
+        return _wsgi_bytes(self.environ.get("PATH_INFO", "")).decode(
+            "UTF-8", errors="replace"
+        )
+
+    @cached_property
+    def path(self) -> str:
+        """Url quoted script name and path, as WebOb's `path`"""
+        path = self.environ.get("SCRIPT_NAME", "") + self.environ.get("PATH_INFO", "")
+        return quote(_wsgi_bytes(path), safe=PATH_SAFE)
+
+    @property
+    def query_string(self) -> str:
+        return self.environ.get("QUERY_STRING", "")
+
+    @cached_property
+    def host(self) -> str:
+        host = self.environ.get("HTTP_HOST")
+        if host:
+            return host
+        host = self.environ["SERVER_NAME"]
+        port = self.environ.get("SERVER_PORT")
+        default_port = "443" if self.scheme == "https" else "80"
+        return host if port in (None, default_port) else f"{host}:{port}"
+
+    @property
+    def url(self) -> str:
+        url = f"{self.scheme}://{self.host}{self.path}"
+        return f"{url}?{self.query_string}" if self.query_string else url
+
+    @property
+    def remote_addr(self) -> Optional[str]:
+        return self.environ.get("REMOTE_ADDR")
+
+    @cached_property
+    def headers(self) -> EnvironHeaders:
+        return EnvironHeaders(self.environ)
+
+    @cached_property
+    def query(self) -> MultiDict:
+        return MultiDict(
+            parse_qsl(
+                _wsgi_bytes(self.query_string).decode("UTF-8", errors="replace"),
+                keep_blank_values=True,
+            )
+        )
+
+    @property
+    def GET(self) -> MultiDict:
+        return self.query
+
+    @cached_property
+    def cookies(self) -> Dict[str, str]:
+        cookies = {}
+        for cookie in self.environ.get("HTTP_COOKIE", "").split(";"):
+            name, sep, value = cookie.strip().partition("=")
+            if sep and name:
+                cookies[name] = unquote(value.strip().strip('"'))
+        return cookies
+
+    @property
+    def content_type(self) -> str:
+        """Media type without parameters, e.g. `application/json`"""
+        return self.environ.get("CONTENT_TYPE", "").split(";", 1)[0].strip().lower()
+
+    @property
+    def charset(self) -> str:
+        for param in self.environ.get("CONTENT_TYPE", "").split(";")[1:]:
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "charset" and value:
+                return value.strip('"')
+        return "UTF-8"
+
+    @property
+    def content_length(self) -> Optional[int]:
+        try:
+            return int(self.environ["CONTENT_LENGTH"])
+        except (KeyError, ValueError):
+            return None
+
+    def check_body_size(self) -> None:
+        """Raises `RequestEntityTooLarge` if the declared length is too big"""
+        length = self.content_length
+        if self.max_body_size is not None and length and length > self.max_body_size:
+            raise RequestEntityTooLarge(
+                f"Request body of {length} bytes exceeds {self.max_body_size}"
+            )
+
+    def _read_chunks(self, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """Reads the input as it arrives, stopping at the declared length or,
+        without one, where the server says the input ends"""
+        self.check_body_size()
+        stream = self.environ["wsgi.input"]
+        remaining = self.content_length
+        if remaining is None and not self.environ.get("wsgi.input_terminated"):
+            return
+        size = 0
+        while remaining is None or remaining > 0:
+            chunk = stream.read(
+                chunk_size if remaining is None else min(chunk_size, remaining)
+            )
+            if not chunk:
+                break
+            size += len(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+            elif self.max_body_size is not None and size > self.max_body_size:
+                raise RequestEntityTooLarge(
+                    f"Request body exceeds {self.max_body_size} bytes"
+                )
+            yield chunk
+
+    @cached_property
+    def body(self) -> bytes:
+        body = b"".join(self._read_chunks())
+        # keep the body readable for anything else reading wsgi.input
+        self.environ["wsgi.input"] = io.BytesIO(body)
+        self.environ["CONTENT_LENGTH"] = str(len(body))
+        return body
+
+    def iter_body(self, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yields the raw body in chunks without holding it in memory, the
+        body can only be read once this way"""
+        if "body" in self.__dict__:
+            yield self.body
+            return
+        yield from self._read_chunks(chunk_size)
+
+    def save_body(self, path: str) -> int:
+        """Streams the raw body to `path`, returning its size"""
+        size = 0
+        with open(path, "wb") as f:
+            for chunk in self.iter_body():
+                f.write(chunk)
+                size += len(chunk)
+        return size
+
+    def iter_parts(
+        self,
+        spool_threshold: int = SPOOL_THRESHOLD,
+        max_part_size: Optional[int] = None,
+        destinations: Optional[Dict[str, Destination]] = None,
+    ) -> Iterator[Part]:
+        """Parses a multipart/form-data body as it is read, yielding each
+        part once complete, see `MultipartParser`"""
+        content_type, params = parse_options_header(
+            self.environ.get("CONTENT_TYPE", "")
+        )
+        if content_type != "multipart/form-data":
+            raise MultipartError(f"Not a multipart body: {content_type}")
+        parser = MultipartParser(
+            params.get("boundary", ""),
+            spool_threshold=spool_threshold,
+            max_part_size=max_part_size,
+            max_total_size=self.max_body_size,
+            destinations=destinations,
+        )
+        return parser.parse(self.iter_body())
+
+    def multipart(self, **kwargs) -> MultiDict:
+        """All parts of a multipart body by name, takes the `iter_parts`
+        arguments"""
+        return MultiDict([(part.name, part) for part in self.iter_parts(**kwargs)])
+
+    @cached_property
+    def text(self) -> str:
+        return self.body.decode(self.charset)
+
+    @cached_property
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+    @cached_property
+    def form(self) -> MultiDict:
+        """Fields of an url encoded form body"""
+        if self.content_type != "application/x-www-form-urlencoded":
+            return MultiDict([])
+        return MultiDict(
+            parse_qsl(self.body.decode(self.charset), keep_blank_values=True)
+        )
+
+    @cached_property
+    def webob(self):
+        """`webob.Request` for the same environ"""
+        from webob import Request as WebObRequest
+
+        return WebObRequest(self.environ)
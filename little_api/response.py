@@ -1,6 +1,103 @@
 import json
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from webob import Response as WebObResponse
+STREAM_CHUNK_SIZE = 64 * 1024
+
+STATUS_CLASS_REASONS = {
+    1: "Informational",
+    2: "Success",
+    3: "Redirection",
+    4: "Client Error",
+    5: "Server Error",
+}
+
+_status_lines: Dict[int, str] = {}
+
+# default `Serializer` of each table, built when first streamed
+_table_serializers: Dict[type, Callable] = {}
+
+
+def status_line(status_code: int) -> str:
+    """WSGI status line for a code, e.g. `200 OK`"""
+    line = _status_lines.get(status_code)
+    if line is None:
+        try:
+            reason = HTTPStatus(status_code).phrase
+        except ValueError:
+            reason = STATUS_CLASS_REASONS.get(status_code // 100, "Unknown")
+        line = _status_lines[status_code] = f"{status_code} {reason}"
+    return line
+
+
+def content_type_header(content_type: Optional[str]) -> str:
+    """Content type with the UTF-8 charset added for text types"""
+    if content_type is None:
+        content_type = "text/html"
+    if content_type.startswith("text/") and "charset=" not in content_type:
+        content_type += "; charset=UTF-8"
+    return content_type
+
+
+def encode_table(obj: Any) -> Any:
+    """`json.dumps` default encoding `Table` instances with the table's
+    default `Serializer`, e.g. the rows of `db.iter`"""
+    serializer = _table_serializers.get(type(obj))
+    if serializer is None:
+        from little_api.orm import Table
+
+        if not isinstance(obj, Table):
+            raise TypeError(
+                f"Object of type {type(obj).__name__} is not JSON serializable"
+            )
+        serializer = _table_serializers[type(obj)] = obj.serializer()
+    return serializer(obj)
+
+
+def iter_json_array(
+    items: Iterable[Any],
+    default: Optional[Callable] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Encodes items as a JSON array, yielding roughly `chunk_size` byte chunks"""
+    buffer = [b"["]
+    buffered = 1
+    separator = b""
+    for item in items:
+        encoded = separator + json.dumps(item, default=default).encode("UTF-8")
+        separator = b","
+        buffer.append(encoded)
+        buffered += len(encoded)
+        if buffered >= chunk_size:
+            yield b"".join(buffer)
+            buffer = []
+            buffered = 0
+    buffer.append(b"]")
+    yield b"".join(buffer)
+
+
+class ClosingIterator:
+    """Wraps a WSGI response iterable, calling `callbacks` once the server
+    has sent the response and closed it"""
+
+    def __init__(self, app_iter: Iterable[bytes], *callbacks: Callable[[], None]):
+        self._app_iter = app_iter
+        self._callbacks = callbacks
+        self.bytes_sent = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._app_iter:
+            self.bytes_sent += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._app_iter, "close", None)
+            if close is not None:
+                close()
+        finally:
+            for callback in self._callbacks:
+                callback()
 
 
 class Response:
@@ -10,8 +107,27 @@ class Response:
         self.text = None
         self.content_type = None
         self.body = b""
+        self.stream = None
         self.status_code = 200
         self.headers = {}
+        self.background_tasks = []
+
+    def add_background_task(self, func: Callable, *args, **kwargs):
+        """Runs `func(*args, **kwargs)` on the app's background executor once
+        the response has been sent"""
+        self.background_tasks.append((func, args, kwargs))
+
+    def stream_json(self, items: Iterable[Any], default: Optional[Callable] = None):
+        """Streams items as a JSON array without building it in memory,
+        e.g. `response.stream_json(db.iter_raw(User, as_dict=True))`.
+        `Table` instances, e.g. from `db.iter(User)`, are encoded with the
+        table's default serializer, pass `default=UserSerializer` to pick
+        the fields."""
+        stream = iter_json_array(items, default=default or encode_table)
+        close = getattr(items, "close", None)
+        # closing the encoder before it starts wouldn't close `items`
+        self.stream = stream if close is None else ClosingIterator(stream, close)
+        self.content_type = "application/json"
 
     def set_body_and_content_type(self):
         if self.json is not None:
@@ -25,10 +141,31 @@ class Response:
             self.body = self.text
             self.content_type = "text/plain"
 
-    def __call__(self, environ, start_response):
-        self.set_body_and_content_type()
-        response = WebObResponse(
-            body=self.body, content_type=self.content_type, status=self.status_code
-        )
-        response.headers.update(self.headers)
-        return response(environ, start_response)
+    def __call__(self, environ, start_response) -> Iterable[bytes]:
+        headers: List[Tuple[str, str]]
+        if self.stream is not None:
+            app_iter: Iterable[bytes] = self.stream
+            headers = [("Content-Type", content_type_header(self.content_type))]
+        else:
+            self.set_body_and_content_type()
+            body = self.body
+            if isinstance(body, str):
+                body = body.encode("UTF-8")
+            app_iter = [body]
+            headers = [
+                ("Content-Type", content_type_header(self.content_type)),
+                ("Content-Length", str(len(body))),
+            ]
+        if self.headers:
+            # user headers replace the generated ones with the same name
+            names = {name.lower() for name in self.headers}
+            headers = [header for header in headers if header[0].lower() not in names]
+            headers.extend((name, str(value)) for name, value in self.headers.items())
+        start_response(status_line(self.status_code), headers)
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            # the body is never iterated, release what the stream holds
+            close = getattr(app_iter, "close", None)
+            if close is not None:
+                close()
+            return []
+        return app_iter
@@ -0,0 +1,135 @@
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Type
+
+from little_api.orm import Column, ForeignKey, Table
+
+
+def _isoformat(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def _foreign_key_id(value):
+    return value.id if isinstance(value, Table) else value
+
+
+class Serializer:
+    """Turns instances or raw rows of a table into JSON ready dicts.
+
+    The conversion is compiled once into a plain function building the
+    dict literal directly, e.g.
+    `UserSerializer = User.serializer(exclude=["password"])`.
+    Foreign keys serialize to their id unless a serializer for them is
+    passed in `nested`, which needs instances, raw rows only carry the id.
+    `rename` maps fields to the keys they are output as.
+    """
+
+    def __init__(
+        self,
+        table: Type[Table],
+        fields: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        nested: Optional[Dict[str, "Serializer"]] = None,
+        rename: Optional[Dict[str, str]] = None,
+    ):
+        self.table = table
+        self.nested = nested or {}
+        self.rename = rename or {}
+        members = {
+            name: field
+            for name, field in table.get_members()
+            if isinstance(field, (Column, ForeignKey))
+        }
+        if fields is None:
+            fields = ["id"] + list(members)
+        names = list(fields) + list(exclude or []) + list(self.nested)
+        for name in names + list(self.rename):
+            if name != "id" and name not in members:
+                raise ValueError(f"Unknown column for {table.__name__}: {name}")
+        self.fields = [name for name in fields if name not in (exclude or [])]
+        self._members = members
+        self._serialize = self._compile_instance()
+        self._row_serializers: Dict[tuple, Callable] = {}
+
+    def _converter(self, name: str, namespace: Dict) -> Optional[str]:
+        """Name of the function converting a column's value, if it needs one"""
+        field = self._members.get(name)
+        if name in self.nested:
+            namespace[f"_nested_{name}"] = self.nested[name]
+            return f"_nested_{name}"
+        if isinstance(field, ForeignKey):
+            return "_foreign_key_id"
+        if isinstance(field, Column) and hasattr(field.type, "isoformat"):
+            return "_isoformat"
+        return None
+
+    def _compile(self, items: List[str], namespace: Dict) -> Callable:
+        source = "def serialize(obj):\n    return {%s}\n" % ", ".join(items)
+        exec(source, namespace)
+        return namespace["serialize"]
+
+    def _compile_instance(self) -> Callable:
+        namespace: Dict[str, Any] = {
+            "_isoformat": _isoformat,
+            "_foreign_key_id": _foreign_key_id,
+        }
+        items = []
+        for name in self.fields:
+            value = f"obj._column_data.get({name!r})"
+            converter = self._converter(name, namespace)
+            if converter == "_nested_" + name:
+                value = f"(None if {value} is None else {converter}({value}))"
+            elif converter is not None:
+                value = f"{converter}({value})"
+            items.append(f"{self.rename.get(name, name)!r}: {value}")
+        return self._compile(items, namespace)
+
+    def _compile_row(self, row_fields: tuple) -> Callable:
+        namespace: Dict[str, Any] = {"_isoformat": _isoformat}
+        positions = {field: idx for idx, field in enumerate(row_fields)}
+        items = []
+        for name in self.fields:
+            if name in self.nested:
+                raise ValueError(
+                    f"Can't nest {name} in rows, they only carry {name}_id, "
+                    "serialize instances instead"
+                )
+            column = name
+            if isinstance(self._members.get(name), ForeignKey):
+                # raw rows only carry the foreign key's id
+                column = f"{name}_id"
+            if column not in positions:
+                raise ValueError(f"Row has no {column} column")
+            value = f"obj[{positions[column]}]"
+            if self._converter(name, {}) == "_isoformat":
+                value = f"_isoformat({value})"
+            items.append(f"{self.rename.get(name, name)!r}: {value}")
+        return self._compile(items, namespace)
+
+    def __call__(self, instance: Table) -> Dict:
+        return self._serialize(instance)
+
+    def many(self, instances: Iterable[Table]) -> List[Dict]:
+        return list(map(self._serialize, instances))
+
+    def from_row(self, row: Sequence, fields: Optional[Sequence[str]] = None) -> Dict:
+        """Serializes a raw row tuple, by default in `Table.get_select_all_sql`
+        column order, e.g. from `Database.iter_raw` or `mode="tuples"`"""
+        return self.row_serializer(fields)(row)
+
+    def row_serializer(self, fields: Optional[Sequence[str]] = None) -> Callable:
+        """Compiled function serializing row tuples with the given columns"""
+        if fields is None:
+            _, fields = self.table.get_select_all_sql()
+        key = tuple(fields)
+        serialize = self._row_serializers.get(key)
+        if serialize is None:
+            serialize = self._row_serializers[key] = self._compile_row(key)
+        return serialize
+
+    def dumps(self, obj) -> bytes:
+        """JSON bytes for an instance or an iterable of instances"""
+        if isinstance(obj, Table):
+            data: Any = self._serialize(obj)
+        else:
+            data = self.many(obj)
+        return json.dumps(data).encode("UTF-8")
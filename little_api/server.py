@@ -0,0 +1,170 @@
+"""Production server, `little-api serve example_app:app --workers 4 --preload`.
+
+Wraps gunicorn's prefork server.  With `--preload` the app is imported once
+in the master so the route table, compiled templates and static manifest are
+shared copy-on-write by the workers.  Send the master SIGHUP to reload the
+app's config and gracefully replace its workers.
+"""
+
+import argparse
+import importlib
+import os
+import resource
+import sys
+from typing import Dict, Optional
+
+from gunicorn.app.base import BaseApplication
+
+from little_api.api import API
+
+
+def load_app(app_uri: str) -> API:
+    """Imports `module:attribute`, the attribute defaults to `app`"""
+    module_name, _, attribute = app_uri.partition(":")
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    module = importlib.import_module(module_name)
+    try:
+        return getattr(module, attribute or "app")
+    except AttributeError:
+        raise ImportError(
+            f"{module_name} has no attribute {attribute or 'app'}"
+        ) from None
+
+
+def max_rss_bytes() -> int:
+    """Peak resident memory of this process"""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in kilobytes on linux and bytes on macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def post_fork(server, worker) -> None:
+    app = server.app.api
+    if app is not None:
+        app.worker_init()
+
+
+def post_worker_init(worker) -> None:
+    if worker.app.api is None:
+        # not preloaded, the worker loaded the app itself
+        worker.app.api = worker.wsgi
+        worker.wsgi.worker_init()
+
+
+def post_request(worker, req, environ, resp) -> None:
+    max_memory = worker.app.max_memory
+    if max_memory and worker.alive and max_rss_bytes() > max_memory:
+        worker.log.info(
+            "Worker %s exceeded %d bytes of memory, restarting", worker.pid, max_memory
+        )
+        worker.alive = False
+
+
+def on_reload(server) -> None:
+    # with a preloaded app the new workers are forked from the master
+    app = server.app.api
+    if app is not None:
+        app.config.reload()
+
+
+def worker_exit(server, worker) -> None:
+    app = worker.app.api
+    if app is not None:
+        app.shutdown(timeout=worker.cfg.graceful_timeout)
+
+
+class Server(BaseApplication):
+    def __init__(
+        self,
+        app_uri: str,
+        options: Optional[Dict] = None,
+        max_memory: Optional[int] = None,
+    ):
+        self.app_uri = app_uri
+        self.options = options or {}
+        self.max_memory = max_memory
+        self.api: Optional[API] = None
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            if value is not None:
+                self.cfg.set(key, value)
+        self.cfg.set("post_fork", post_fork)
+        self.cfg.set("post_worker_init", post_worker_init)
+        self.cfg.set("post_request", post_request)
+        self.cfg.set("worker_exit", worker_exit)
+        self.cfg.set("on_reload", on_reload)
+
+    def load(self) -> API:
+        app = load_app(self.app_uri)
+        app.startup()
+        if self.cfg.preload_app:
+            self.api = app
+        return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="little-api")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run an app with the prefork server")
+    serve.add_argument("app", help="app to serve as module:attribute")
+    serve.add_argument("-b", "--bind", default="127.0.0.1:8000")
+    serve.add_argument(
+        "-w", "--workers", type=int, default=os.cpu_count() or 1, help="processes"
+    )
+    serve.add_argument(
+        "--threads", type=int, default=1, help="threads handling requests per worker"
+    )
+    serve.add_argument(
+        "--preload",
+        action="store_true",
+        help="load the app in the master before forking workers",
+    )
+    serve.add_argument(
+        "--max-requests",
+        type=int,
+        default=0,
+        help="restart a worker after this many requests, 0 disables",
+    )
+    serve.add_argument("--max-requests-jitter", type=int, default=0)
+    serve.add_argument(
+        "--max-memory",
+        type=int,
+        default=0,
+        help="restart a worker once it used this many MB, 0 disables",
+    )
+    serve.add_argument("--timeout", type=int, default=30)
+    serve.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=30,
+        help="seconds workers get to finish requests when restarting",
+    )
+    serve.add_argument("--reload", action="store_true", help="restart on code changes")
+    serve.add_argument("--daemon", action="store_true")
+    serve.add_argument("--log-level", default="info")
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "preload_app": args.preload,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter,
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "reload": args.reload,
+        "daemon": args.daemon,
+        "loglevel": args.log_level,
+    }
+    Server(args.app, options, max_memory=args.max_memory * 1024 * 1024).run()
+
+
+if __name__ == "__main__":
+    main()
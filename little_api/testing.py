@@ -0,0 +1,277 @@
+import io
+import json as json_module
+import sys
+from http.cookies import SimpleCookie
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlencode, urljoin, urlsplit
+from wsgiref.headers import Headers
+
+
+class _IterableInput(io.RawIOBase):
+    """File-like `wsgi.input` reading from an iterable of byte chunks"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class TestResponse:
+    """Response returned by `TestClient`, unless the request was made with
+    `stream=True` the body has already been read and the app_iter closed"""
+
+    __test__ = False
+
+    def __init__(self, status: str, headers: List[Tuple[str, str]], app_iter):
+        self.status_code = int(status.split(" ", 1)[0])
+        self.reason = status.split(" ", 1)[1] if " " in status else ""
+        self.headers = Headers(headers)
+        self._app_iter = app_iter
+        self._content: Optional[bytes] = None
+        self._closed = False
+
+    @property
+    def cookies(self) -> Dict[str, str]:
+        cookie: SimpleCookie = SimpleCookie()
+        for header in self.headers.get_all("Set-Cookie"):
+            cookie.load(header)
+        return {name: morsel.value for name, morsel in cookie.items()}
+
+    def iter_content(self, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        """Yields the body as the app produces it, or in `chunk_size` byte
+        chunks, the last one possibly shorter"""
+        if self._content is not None:
+            chunks: Iterable[bytes] = [self._content]
+        else:
+            chunks = self._iter_app()
+        if chunk_size is None:
+            yield from chunks
+            return
+        buffer = b""
+        for chunk in chunks:
+            buffer += chunk
+            while len(buffer) >= chunk_size:
+                yield buffer[:chunk_size]
+                buffer = buffer[chunk_size:]
+        if buffer:
+            yield buffer
+
+    def _iter_app(self) -> Iterator[bytes]:
+        try:
+            for chunk in self._app_iter:
+                if chunk:
+                    yield chunk
+        finally:
+            self.close()
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            self._content = b"".join(self.iter_content())
+        return self._content
+
+    @property
+    def encoding(self) -> str:
+        content_type = self.headers.get("Content-Type", "")
+        for param in content_type.split(";")[1:]:
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "charset" and value:
+                return value.strip('"')
+        return "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self) -> Any:
+        return json_module.loads(self.content)
+
+    def close(self) -> None:
+        """Closes the app_iter, letting the app run its post-response work"""
+        if self._closed:
+            return
+        self._closed = True
+        close = getattr(self._app_iter, "close", None)
+        if close is not None:
+            close()
+
+
+class TestClient:
+    """Calls a WSGI app in process, building the environ directly.
+
+    Relative and absolute urls are accepted, cookies set by responses are
+    kept in `cookies` and sent with later requests.  Exceptions raised by
+    the app, or turned into a 500 response by little-api's default handler,
+    propagate to the caller unless `raise_server_exceptions` is False.
+    """
+
+    __test__ = False
+
+    def __init__(
+        self,
+        app: Callable,
+        base_url: str = "http://testserver",
+        raise_server_exceptions: bool = True,
+    ):
+        self.app = app
+        self.base_url = base_url
+        self.raise_server_exceptions = raise_server_exceptions
+        self.cookies: Dict[str, str] = {}
+
+    def build_environ(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict] = None,
+        data: Any = None,
+        json: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        cookies: Optional[Dict[str, str]] = None,
+    ) -> Dict:
+        parts = urlsplit(urljoin(self.base_url + "/", url))
+        query = parts.query
+        if params:
+            query = "&".join(filter(None, [query, urlencode(params, doseq=True)]))
+        headers = dict(headers or {})
+        content_type = None
+        body: Any = b""
+        if json is not None:
+            body = json_module.dumps(json).encode("UTF-8")
+            content_type = "application/json"
+        elif isinstance(data, dict):
+            body = urlencode(data, doseq=True).encode("UTF-8")
+            content_type = "application/x-www-form-urlencoded"
+        elif isinstance(data, str):
+            body = data.encode("UTF-8")
+        elif data is not None:
+            body = data
+
+        environ: Dict[str, Any] = {
+            "REQUEST_METHOD": method.upper(),
+            "SCRIPT_NAME": "",
+            "PATH_INFO": unquote(parts.path, encoding="latin-1") or "/",
+            "QUERY_STRING": query,
+            "SERVER_NAME": parts.hostname or "testserver",
+            "SERVER_PORT": str(parts.port or (443 if parts.scheme == "https" else 80)),
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": parts.netloc,
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": parts.scheme or "http",
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": False,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        if isinstance(body, bytes):
+            environ["wsgi.input"] = io.BytesIO(body)
+            environ["CONTENT_LENGTH"] = str(len(body))
+        else:
+            # streamed request body, read until exhausted
+            read = getattr(body, "read", None)
+            environ["wsgi.input"] = body if read else _IterableInput(body)
+            environ["wsgi.input_terminated"] = True
+        for name, value in headers.items():
+            key = name.upper().replace("-", "_")
+            if key == "CONTENT_TYPE":
+                content_type = value
+            elif key == "CONTENT_LENGTH":
+                environ["CONTENT_LENGTH"] = value
+            else:
+                environ[f"HTTP_{key}"] = value
+        if content_type is not None:
+            environ["CONTENT_TYPE"] = content_type
+        sent_cookies = {**self.cookies, **(cookies or {})}
+        if sent_cookies:
+            environ["HTTP_COOKIE"] = "; ".join(
+                f"{name}={value}" for name, value in sent_cookies.items()
+            )
+        return environ
+
+    def request(self, method: str, url: str, stream: bool = False, **kwargs) -> Any:
+        environ = self.build_environ(method, url, **kwargs)
+        started: List = []
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info is not None and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started[:] = [status, headers]
+
+        app_iter = self.app(environ, start_response)
+        exception = environ.get("little_api.exception")
+        if exception is not None and self.raise_server_exceptions:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+            raise exception
+        if not started:
+            # the app may only call start_response once iteration begins
+            app_iter = _Primed(app_iter)
+        if not started:
+            app_iter.close()
+            raise RuntimeError("The app returned without calling start_response")
+        response = TestResponse(started[0], started[1], app_iter)
+        self._store_cookies(response)
+        if not stream:
+            response.content
+        return response
+
+    def _store_cookies(self, response: TestResponse) -> None:
+        cookie: SimpleCookie = SimpleCookie()
+        for header in response.headers.get_all("Set-Cookie"):
+            cookie.load(header)
+        for name, morsel in cookie.items():
+            if morsel["max-age"] == "0":
+                self.cookies.pop(name, None)
+            else:
+                self.cookies[name] = morsel.value
+
+    def get(self, url: str, **kwargs) -> TestResponse:
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> TestResponse:
+        return self.request("HEAD", url, **kwargs)
+
+    def options(self, url: str, **kwargs) -> TestResponse:
+        return self.request("OPTIONS", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> TestResponse:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> TestResponse:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> TestResponse:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> TestResponse:
+        return self.request("DELETE", url, **kwargs)
+
+
+class _Primed:
+    """App iter whose first chunk was read early to trigger start_response"""
+
+    def __init__(self, app_iter):
+        self._app_iter = app_iter
+        self._iterator = iter(app_iter)
+        self._first = next(self._iterator, b"")
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self._first
+        yield from self._iterator
+
+    def close(self) -> None:
+        close = getattr(self._app_iter, "close", None)
+        if close is not None:
+            close()
@@ -15,14 +15,18 @@ VERSION = "0.0.2"
 REQUIRED = [
     "Jinja2==3.1.5",
     "parse==1.20.2",
-    "requests==2.32.3",
-    "requests-wsgi-adapter==0.4.1",
     "WebOb==1.8.9",
     "whitenoise==6.8.2",
     'pyjwt==2.10.1',
     "gunicorn==23.0.0",
 ]
 
+# What packages are optional?
+EXTRAS = {
+    # columnar ORM results as numpy arrays
+    "numpy": ["numpy"],
+}
+
 here = os.path.abspath(os.path.dirname(__file__))
 
 # Import the README and use it as the long-description.
@@ -53,8 +57,10 @@ setup(
     author=AUTHOR,
     author_email=EMAIL,
     python_requires=REQUIRES_PYTHON,
-    packages=find_packages(exclude=["test_*"]),
+    packages=find_packages(exclude=["test_*", "benchmarks"]),
     install_requires=REQUIRED,
+    extras_require=EXTRAS,
+    entry_points={"console_scripts": ["little-api=little_api.server:main"]},
     include_package_data=True,
     license="MIT",
     classifiers=["Programming Language :: Python :: 3.6"],
@@ -0,0 +1,119 @@
+import json
+from wsgiref.util import FileWrapper, setup_testing_defaults
+
+from little_api.access_log import AccessLog
+from little_api.api import API
+
+
+def read_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_requests_are_logged(api, client, tmp_path):
+    path = str(tmp_path / "access.log")
+    api.enable_access_log(path)
+
+    @api.route("/user/{user_id:d}")
+    def user(req, resp, user_id):
+        resp.text = "hello"
+
+    client.get("/user/1")
+    client.post("/missing")
+    api.shutdown()
+
+    first, second = read_records(path)
+    assert first["method"] == "GET"
+    assert first["route"] == "/user/{user_id:d}"
+    assert first["status"] == 200
+    assert first["bytes"] == 5
+    assert set(first["timings"]) == {
+        "before_request",
+        "handler",
+        "after_request",
+        "app",
+        "total",
+    }
+    assert second["route"] is None
+    assert second["status"] == 404
+
+
+def test_static_file_wrappers_are_not_wrapped(tmp_path):
+    static_dir = tmp_path / "static"
+    static_dir.mkdir()
+    (static_dir / "main.css").write_text("body {}")
+    api = API(static_dir=str(static_dir))
+    path = str(tmp_path / "access.log")
+    api.enable_access_log(path)
+
+    environ = {"PATH_INFO": "/static/main.css", "wsgi.file_wrapper": FileWrapper}
+    setup_testing_defaults(environ)
+    app_iter = api(environ, lambda status, headers, exc_info=None: None)
+    # the server can still see the file and use sendfile
+    assert isinstance(app_iter, FileWrapper)
+    assert b"".join(app_iter) == b"body {}"
+    app_iter.close()
+    api.shutdown()
+
+    [record] = read_records(path)
+    assert (record["status"], record["bytes"]) == (200, 7)
+
+
+def test_records_are_written_in_the_background(tmp_path):
+    path = tmp_path / "access.log"
+    log = AccessLog(str(path), flush_interval=60)
+    log.log({"status": 200})
+    assert not path.exists()
+
+    log.flush()
+    assert read_records(path) == [{"status": 200}]
+    log.close()
+
+
+def test_successful_requests_are_sampled(tmp_path):
+    path = str(tmp_path / "access.log")
+    log = AccessLog(path, sample_rate=0.0)
+    log.log({"status": 200})
+    log.log({"status": 500})
+    log.log({"status": None})
+    log.close()
+
+    assert read_records(path) == [{"status": 500}]
+
+
+def test_pending_records_are_bounded(tmp_path):
+    log = AccessLog(str(tmp_path / "access.log"), max_pending=1, flush_interval=60)
+    log.log({"status": 200})
+    log.log({"status": 201})
+    assert log.dropped == 1
+    log.close()
+
+
+def test_size_based_rotation(tmp_path):
+    path = tmp_path / "access.log"
+    log = AccessLog(str(path), max_bytes=10, backup_count=2)
+    for status in (200, 201, 202, 203):
+        log.log({"status": status})
+        log.flush()
+    log.close()
+
+    assert not path.exists()
+    assert read_records(f"{path}.1") == [{"status": 203}]
+    assert read_records(f"{path}.2") == [{"status": 202}]
+    assert not (tmp_path / "access.log.3").exists()
+
+
+def test_writers_sharing_a_path_rotate_once(tmp_path):
+    path = tmp_path / "access.log"
+    logs = [AccessLog(str(path), max_bytes=40, backup_count=50) for _ in range(2)]
+    for status in range(200, 240):
+        log = logs[status % 2]
+        log.log({"status": status})
+        log.flush()
+    for log in logs:
+        log.close()
+
+    files = [path] if path.exists() else []
+    files += sorted(tmp_path.glob("access.log.*"))
+    statuses = [record["status"] for f in files for record in read_records(f)]
+    assert sorted(statuses) == list(range(200, 240))
@@ -0,0 +1,204 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from little_api.async_orm import AsyncDatabase
+from little_api.orm import Column, QueryCache, Table
+
+
+class Note(Table):
+    text = Column(str)
+    views = Column(int)
+
+
+@pytest.fixture(params=["file", "memory"])
+def adb(request, tmp_path):
+    path = str(tmp_path / "async.db") if request.param == "file" else ":memory:"
+    adb = AsyncDatabase(path, cache=QueryCache())
+    asyncio.run(adb.create(Note))
+    yield adb
+    adb.close()
+
+
+def test_save_get_update_delete(adb):
+    async def run():
+        note = Note(text="hello", views=1)
+        await adb.save(note)
+        assert note.id is not None
+
+        [fetched] = await adb.get(Note, id=note.id)
+        assert fetched.text == "hello"
+
+        fetched.views = 2
+        await adb.update(fetched)
+        assert (await adb.get(Note, mode="tuples", id=note.id)) == [(1, "hello", 2)]
+
+        await adb.delete(fetched)
+        assert await adb.all(Note) == []
+
+    asyncio.run(run())
+
+
+def test_async_query(adb):
+    async def run():
+        await adb.save_many([Note(text=str(i), views=i) for i in range(10)])
+        query = adb.query(Note).where(views__gte=5).order_by("-views")
+        assert [n.views for n in await query.limit(2).all()] == [9, 8]
+        assert (await query.first()).views == 9
+        assert await query.count() == 5
+        assert await query.sum("views") == 35
+        assert await adb.count(Note) == 10
+        assert await adb.exists(Note, text="3")
+
+    asyncio.run(run())
+
+
+def test_concurrent_writes_are_group_committed(adb):
+    async def run():
+        notes = [Note(text=str(i), views=i) for i in range(200)]
+        await asyncio.gather(*(adb.save(note) for note in notes))
+        assert len({note.id for note in notes}) == 200
+        assert await adb.count(Note) == 200
+
+    asyncio.run(run())
+    assert adb.commits < 200
+
+
+def test_failed_write_does_not_fail_batch(adb):
+    async def run():
+        def fail(db):
+            raise ValueError("boom")
+
+        note = Note(text="kept", views=1)
+        results = await asyncio.gather(
+            adb.save(note), adb.write(fail), return_exceptions=True
+        )
+        assert results[0] is None
+        assert isinstance(results[1], ValueError)
+        assert [n.text for n in await adb.all(Note)] == ["kept"]
+
+    asyncio.run(run())
+
+
+def test_cancelled_write_does_not_stop_writer(tmp_path):
+    adb = AsyncDatabase(str(tmp_path / "async.db"), max_batch=1)
+    release = threading.Event()
+
+    async def run():
+        await adb.create(Note)
+        blocker = asyncio.ensure_future(adb.write(lambda db: release.wait(5)))
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(adb.save(Note(text="dropped", views=1)), 0.05)
+        release.set()
+        await blocker
+        await asyncio.wait_for(adb.save(Note(text="kept", views=2)), 5)
+        assert [n.text for n in await adb.all(Note)] == ["kept"]
+
+    asyncio.run(run())
+    adb.close()
+
+
+def test_writers_wait_for_room_in_queue(tmp_path):
+    adb = AsyncDatabase(str(tmp_path / "async.db"), max_queue=2, max_batch=1)
+
+    release = threading.Event()
+    queued = []
+
+    def slow_save(db):
+        queued.append(adb._queue.qsize())
+        release.wait(5)
+        db.save(Note(text="x", views=1))
+
+    async def run():
+        await adb.create(Note)
+        writes = [asyncio.ensure_future(adb.write(slow_save)) for _ in range(20)]
+        await asyncio.sleep(0.05)
+        # the rest wait on the loop, not in executor threads
+        assert adb._queue.qsize() <= 1
+        release.set()
+        await asyncio.gather(*writes)
+        assert await adb.count(Note) == 20
+
+    asyncio.run(run())
+    adb.close()
+    assert max(queued) <= 1
+
+
+def test_write_after_close_raises(tmp_path):
+    adb = AsyncDatabase(str(tmp_path / "async.db"))
+    asyncio.run(adb.create(Note))
+    adb.close()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(asyncio.wait_for(adb.save(Note(text="late", views=1)), 5))
+
+
+class WriterStopped(BaseException):
+    pass
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_writer_failure_fails_pending_writes(tmp_path):
+    adb = AsyncDatabase(str(tmp_path / "async.db"))
+
+    def stop(db):
+        raise WriterStopped
+
+    async def run():
+        await adb.create(Note)
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                adb.write(stop),
+                adb.save(Note(text="queued", views=1)),
+                return_exceptions=True,
+            ),
+            5,
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(adb.save(Note(text="late", views=1)), 5)
+
+    asyncio.run(run())
+    adb.close()
+
+
+def test_read_during_uncommitted_write_is_not_cached_as_fresh(tmp_path):
+    adb = AsyncDatabase(str(tmp_path / "async.db"), cache=QueryCache())
+    saved = threading.Event()
+    commit = threading.Event()
+
+    def slow_save(db):
+        db.save(Note(text="new", views=1))
+        saved.set()
+        commit.wait(timeout=5)
+
+    async def run():
+        await adb.create(Note)
+        write = asyncio.ensure_future(adb.write(slow_save))
+        await asyncio.get_running_loop().run_in_executor(None, saved.wait)
+        # a reader sees the last committed rows while the write is open
+        assert await adb.all(Note) == []
+        commit.set()
+        await write
+        assert [note.text for note in await adb.all(Note)] == ["new"]
+
+    asyncio.run(run())
+    adb.close()
+
+
+def test_close_closes_reader_connections(tmp_path):
+    adb = AsyncDatabase(str(tmp_path / "async.db"))
+
+    async def run():
+        await adb.create(Note)
+        await asyncio.gather(*(adb.count(Note) for _ in range(10)))
+
+    asyncio.run(run())
+    reader_conns = [conn for db in adb._reader_dbs for conn in db._connections]
+    assert reader_conns
+    adb.close()
+    for conn in reader_conns:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
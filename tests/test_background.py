@@ -0,0 +1,123 @@
+import threading
+import time
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+from little_api.background import BackgroundExecutor
+
+
+def call_app(api, path="/"):
+    environ = {"PATH_INFO": path}
+    setup_testing_defaults(environ)
+    app_iter = api(environ, lambda status, headers: None)
+    body = b"".join(app_iter)
+    return app_iter, body
+
+
+def test_tasks_run_after_response_is_sent(api):
+    ran = threading.Event()
+    calls = []
+
+    @api.route("/")
+    def index(req, resp):
+        resp.text = "done"
+        resp.add_background_task(calls.append, "audit")
+        resp.add_background_task(ran.set)
+
+    app_iter, body = call_app(api)
+    assert body == b"done"
+    assert calls == []
+
+    app_iter.close()
+    assert ran.wait(1)
+    assert calls == ["audit"]
+    api.shutdown()
+
+
+def test_no_wrapping_without_tasks(api):
+    @api.route("/")
+    def index(req, resp):
+        resp.text = "done"
+
+    app_iter, _ = call_app(api)
+    assert type(app_iter).__name__ != "ClosingIterator"
+
+
+def test_api_background(api):
+    ran = threading.Event()
+    assert api.background(ran.set)
+    assert ran.wait(1)
+    api.shutdown()
+    assert api.background_executor.metrics()["completed"] == 1
+
+
+def test_shutdown_drains_queue():
+    executor = BackgroundExecutor(max_workers=1)
+    results = []
+    for i in range(5):
+        executor.submit(lambda i=i: (time.sleep(0.01), results.append(i)))
+    executor.shutdown()
+
+    assert results == [0, 1, 2, 3, 4]
+    assert executor.submit(print) is False
+    assert executor.metrics()["dropped"] == 1
+
+
+def test_tasks_after_shutdown_are_dropped(api):
+    calls = []
+
+    @api.route("/")
+    def index(req, resp):
+        resp.add_background_task(calls.append, "audit")
+
+    app_iter, _ = call_app(api)
+    api.shutdown()
+    app_iter.close()
+    assert calls == []
+    assert api.background_executor.metrics()["dropped"] == 1
+
+
+@pytest.mark.parametrize("overflow,ran,dropped", [("drop", 0, 1), ("run", 1, 0)])
+def test_overflow_policies(overflow, ran, dropped):
+    executor = BackgroundExecutor(max_workers=1, max_queue=1, overflow=overflow)
+    release = threading.Event()
+    executor.submit(release.wait)
+    while executor.queue_depth:
+        time.sleep(0.001)
+    executor.submit(lambda: None)
+
+    calls = []
+    accepted = executor.submit(calls.append, 1)
+    assert accepted == (dropped == 0)
+    assert len(calls) == ran
+    assert executor.metrics()["dropped"] == dropped
+    release.set()
+    executor.shutdown()
+
+
+def test_block_overflow_waits_for_room():
+    executor = BackgroundExecutor(max_workers=1, max_queue=1, overflow="block")
+    calls = []
+    for i in range(10):
+        executor.submit(calls.append, i)
+    executor.shutdown()
+    assert calls == list(range(10))
+
+
+def test_failed_tasks_are_counted():
+    executor = BackgroundExecutor(max_workers=1)
+    executor.submit(lambda: 1 / 0)
+    executor.submit(lambda: None)
+    executor.shutdown()
+
+    metrics = executor.metrics()
+    assert metrics["failed"] == 1
+    assert metrics["completed"] == 2
+    assert metrics["queue_depth"] == 0
+    assert metrics["max_latency"] >= metrics["avg_latency"] > 0
+
+
+def test_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        BackgroundExecutor(overflow="explode")
@@ -0,0 +1,61 @@
+import json
+
+from benchmarks import bench_app, bench_orm
+from benchmarks.__main__ import main
+from benchmarks.runner import Benchmark, compare, run
+
+
+def test_run_reports_timings_and_allocations():
+    calls = []
+    benchmark = Benchmark("list", lambda: lambda: calls.append([0] * 1000))
+    results = run([benchmark], time_scale=0.01, report=lambda line: None)
+
+    result = results["results"]["list"]
+    assert result["iterations"] >= 3
+    assert result["ops_per_sec"] > 0
+    assert result["p50_us"] <= result["p99_us"]
+    assert result["alloc_peak_bytes"] >= 8000
+
+
+def test_compare_flags_regressions(tmp_path, capsys):
+    def results(**p50s):
+        return {"results": {name: {"p50_us": p50} for name, p50 in p50s.items()}}
+
+    baseline = results(fast=10.0, slow=10.0, removed=1.0)
+    current = results(fast=10.5, slow=20.0, added=1.0)
+    rows = {row["name"]: row for row in compare(baseline, current, threshold=0.1)}
+    assert set(rows) == {"fast", "slow"}
+    assert not rows["fast"]["regression"]
+    assert rows["slow"]["regression"]
+
+    paths = []
+    for name, data in [("baseline", baseline), ("current", current)]:
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps(data))
+        paths.append(str(path))
+    assert main(["compare", *paths]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
+    assert main(["compare", *paths, "--threshold", "1.5"]) == 0
+
+
+def test_suite_setup_is_deferred(monkeypatch):
+    def temp_dir():
+        raise AssertionError("temp dir created before the benchmark ran")
+
+    monkeypatch.setattr(bench_app, "temp_dir", temp_dir)
+    names = [benchmark.name for benchmark in bench_app.benchmarks(quick=True)]
+    assert "static/16k" in names
+
+
+def test_orm_save_benchmarks_run():
+    suite = [
+        benchmark
+        for benchmark in bench_orm.benchmarks(quick=True)
+        if benchmark.name.startswith("orm/save/") and benchmark.name.endswith("/1000")
+    ]
+    assert [benchmark.name for benchmark in suite] == [
+        "orm/save/plain/1000",
+        "orm/save/fk/1000",
+    ]
+    results = run(suite, time_scale=0.01, report=lambda line: None)
+    assert all(result["iterations"] >= 3 for result in results["results"].values())
@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from little_api.cache import LRUCache, SQLiteCache
+
+
+def test_get_set_delete():
+    cache = LRUCache()
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert "a" in cache
+    assert cache.get("b", "default") == "default"
+
+    cache.delete("a")
+    assert "a" not in cache
+    cache.delete("a")
+
+
+def test_least_recently_used_is_evicted():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert len(cache) == 2
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_entries_expire():
+    cache = LRUCache(ttl=0.01)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_clear():
+    cache = LRUCache()
+    cache.set("a", 1)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_lru_get_or_set():
+    cache = LRUCache()
+    assert cache.get_or_set("a", lambda: 1) == 1
+    assert cache.get_or_set("a", lambda: 2) == 1
+
+
+@pytest.fixture
+def sqlite_cache(tmp_path):
+    return SQLiteCache(str(tmp_path / "cache.db"))
+
+
+def test_sqlite_cache_get_set_delete(sqlite_cache):
+    sqlite_cache.set("a", {"rows": [1, 2]})
+    sqlite_cache.set(("table", 1, "SELECT"), [(1, "John")])
+    assert sqlite_cache.get("a") == {"rows": [1, 2]}
+    assert sqlite_cache.get(("table", 1, "SELECT")) == [(1, "John")]
+    assert sqlite_cache.get("b", "default") == "default"
+    assert len(sqlite_cache) == 2
+
+    sqlite_cache.delete("a")
+    assert "a" not in sqlite_cache
+    sqlite_cache.clear()
+    assert len(sqlite_cache) == 0
+
+
+def test_sqlite_cache_is_shared(tmp_path, sqlite_cache):
+    other = SQLiteCache(sqlite_cache.path)
+    sqlite_cache.set("a", 1)
+    assert other.get("a") == 1
+    assert other.get_or_set("a", lambda: 2) == 1
+
+
+def test_sqlite_cache_entries_expire(sqlite_cache):
+    sqlite_cache.set("a", 1, ttl=-1)
+    sqlite_cache.set("b", 2, ttl=60)
+    assert sqlite_cache.get("a") is None
+    assert sqlite_cache.get_or_set("a", lambda: 3) == 3
+    assert sqlite_cache.get("b") == 2
+
+
+def test_sqlite_cache_size_caps(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=3, prune_interval=1)
+    for idx in range(5):
+        cache.set(idx, idx)
+    assert len(cache) == 3
+    assert cache.get(0) is None
+    assert cache.get(4) == 4
+
+    cache = SQLiteCache(str(tmp_path / "bytes.db"), max_bytes=250, prune_interval=1)
+    for idx in range(5):
+        cache.set(idx, b"x" * 100)
+    assert len(cache) == 2
+    assert cache.get(3) is not None and cache.get(2) is None
+
+
+def _racer(path, queue):
+    queue.put(SQLiteCache(path).get_or_set("key", os.getpid))
+
+
+def test_sqlite_cache_get_or_set_is_atomic_across_processes(sqlite_cache):
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    processes = [
+        context.Process(target=_racer, args=(sqlite_cache.path, queue))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    results = {queue.get(timeout=10) for _ in processes}
+    for process in processes:
+        process.join()
+    assert results == {sqlite_cache.get("key")}
+
+
+def test_sqlite_cache_reopen_in_thread(sqlite_cache):
+    sqlite_cache.set("a", 1)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(sqlite_cache.get("a")))
+    thread.start()
+    thread.join()
+    sqlite_cache.reopen()
+    assert results == [1]
+    assert sqlite_cache.get("a") == 1
@@ -1,4 +1,11 @@
-from little_api.config import Config
+import json
+import os
+import signal
+
+import pytest
+
+from little_api.config import FRAMEWORK_SETTINGS, Config
+from little_api.exceptions import ConfigError
 
 
 def test_set_get_item():
@@ -24,3 +31,194 @@ def test_len_and_iter():
     assert len(config) == len(values)
     for key, value in values:
         assert config[key] == value
+    assert list(config) == ["name", "age"]
+
+
+def test_validates_defined_types():
+    config = Config(schema={"PORT": (int, 8000)})
+    with pytest.raises(ConfigError):
+        config["PORT"] = "80"
+    with pytest.raises(ConfigError):
+        config["PORT"] = True
+    config["PORT"] = 80
+    config["OTHER"] = "anything"
+    assert config["PORT"] == 80
+
+
+def test_defaults_in_mapping_view():
+    config = Config(schema=FRAMEWORK_SETTINGS)
+    config.define("X", int, 5)
+    config["Y"] = 1
+
+    assert config["X"] == config.get("X") == config.settings.X == 5
+    assert config["JWT_EXPIRE_SECONDS"] == 3600
+    assert len(config) == len(list(config)) == 5
+    assert dict(config) == config.settings.as_dict()
+
+    config["X"] = 6
+    assert config["X"] == 6
+    del config["X"]
+    assert config["X"] == 5
+
+
+def test_load_env_coerces_prefixed_variables(monkeypatch):
+    monkeypatch.setenv("APP_PORT", "8080")
+    monkeypatch.setenv("APP_DEBUG", "yes")
+    monkeypatch.setenv("APP_HOSTS", '["a", "b"]')
+    monkeypatch.setenv("APP_NAME", "demo")
+    monkeypatch.setenv("OTHER_PORT", "1")
+    config = Config(schema={"PORT": (int, 80), "DEBUG": (bool, False)})
+    config.define("HOSTS", list)
+    config.load_env(prefix="APP_")
+
+    assert dict(config) == {
+        "PORT": 8080,
+        "DEBUG": True,
+        "HOSTS": ["a", "b"],
+        "NAME": "demo",
+    }
+
+
+def test_load_env_invalid_value(monkeypatch):
+    monkeypatch.setenv("APP_PORT", "eighty")
+    config = Config(schema={"PORT": (int, 80)})
+    with pytest.raises(ConfigError):
+        config.load_env(prefix="APP_")
+
+
+def test_load_file_toml_and_json(tmp_path):
+    toml_file = tmp_path / "settings.toml"
+    toml_file.write_text('SECRET = "s3cret"\n\n[app]\nJWT_EXPIRE_SECONDS = 60\n')
+    json_file = tmp_path / "settings.json"
+    json_file.write_text(json.dumps({"MAX_BODY_SIZE": 1024}))
+    config = Config(schema=FRAMEWORK_SETTINGS)
+    config.load_file(str(toml_file))
+    config.load_file(str(toml_file), section="app")
+    config.load_file(str(json_file))
+
+    assert config["SECRET"] == "s3cret"
+    assert config["JWT_EXPIRE_SECONDS"] == 60
+    assert config["MAX_BODY_SIZE"] == 1024
+
+    json_file.write_text(json.dumps({"MAX_BODY_SIZE": "big"}))
+    with pytest.raises(ConfigError):
+        config.load_file(str(json_file))
+    with pytest.raises(ConfigError):
+        config.load_file(str(tmp_path / "settings.ini"))
+
+
+def test_settings_snapshot():
+    config = Config(schema=FRAMEWORK_SETTINGS)
+    config["SECRET"] = "secret"
+    config["not an identifier"] = 1
+    settings = config.settings
+
+    assert settings.SECRET == "secret"
+    assert settings.JWT_EXPIRE_SECONDS == 3600
+    assert settings.MAX_BODY_SIZE is None
+    assert config.settings is settings
+    assert not hasattr(settings, "__dict__")
+    with pytest.raises(AttributeError):
+        settings.SECRET = "changed"
+    with pytest.raises(AttributeError):
+        settings.MISSING
+
+    config["SECRET"] = "changed"
+    assert settings.SECRET == "secret"
+    assert config.settings.SECRET == "changed"
+
+
+def test_reload_swaps_snapshot(tmp_path, monkeypatch):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"JWT_EXPIRE_SECONDS": 60}))
+    monkeypatch.setenv("LITTLE_API_SECRET", "one")
+    config = Config(schema=FRAMEWORK_SETTINGS)
+    config.load_file(str(path))
+    config.load_env()
+    settings = config.settings
+
+    path.write_text(json.dumps({"JWT_EXPIRE_SECONDS": 120}))
+    monkeypatch.setenv("LITTLE_API_SECRET", "two")
+    config.reload()
+
+    assert (settings.SECRET, settings.JWT_EXPIRE_SECONDS) == ("one", 60)
+    assert (config.settings.SECRET, config.settings.JWT_EXPIRE_SECONDS) == ("two", 120)
+
+
+def test_reload_keeps_settings_on_error(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"JWT_EXPIRE_SECONDS": 60}))
+    config = Config(schema=FRAMEWORK_SETTINGS)
+    config.load_file(str(path))
+    settings = config.settings
+
+    path.write_text("{not json")
+    config.reload()
+    path.write_text(json.dumps({"JWT_EXPIRE_SECONDS": "soon"}))
+    config.reload()
+
+    assert config.settings is settings
+    assert config["JWT_EXPIRE_SECONDS"] == 60
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="no SIGHUP")
+def test_reload_on_signal(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"SECRET": "old"}))
+    config = Config(schema=FRAMEWORK_SETTINGS)
+    config.load_file(str(path))
+    previous = signal.getsignal(signal.SIGHUP)
+    try:
+        config.reload_on_signal()
+        path.write_text(json.dumps({"SECRET": "new"}))
+        os.kill(os.getpid(), signal.SIGHUP)
+    finally:
+        signal.signal(signal.SIGHUP, previous)
+
+    assert config.settings.SECRET == "new"
+
+
+def test_reload_drops_keys_removed_from_sources(tmp_path, monkeypatch):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"SECRET": "secret", "REMOVED": 1}))
+    monkeypatch.setenv("LITTLE_API_GONE", "yes")
+    config = Config(schema=FRAMEWORK_SETTINGS)
+    config.load_file(str(path))
+    config.load_env()
+    config["DIRECT"] = True
+
+    path.write_text(json.dumps({"SECRET": "secret"}))
+    monkeypatch.delenv("LITTLE_API_GONE")
+    config.reload()
+
+    assert "REMOVED" not in config
+    assert "GONE" not in config
+    assert config["DIRECT"] is True
+    assert config.settings.SECRET == "secret"
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="no SIGHUP")
+def test_signal_during_reload_does_not_deadlock(tmp_path, monkeypatch):
+    path = tmp_path / "settings.json"
+    path.write_text(json.dumps({"SECRET": "new"}))
+    config = Config(schema=FRAMEWORK_SETTINGS)
+    config.load_file(str(path))
+    read_file = config._read_file
+    signalled = []
+
+    def read_file_and_signal(*args):
+        if not signalled:
+            signalled.append(True)
+            os.kill(os.getpid(), signal.SIGHUP)
+        return read_file(*args)
+
+    monkeypatch.setattr(config, "_read_file", read_file_and_signal)
+    previous = signal.getsignal(signal.SIGHUP)
+    try:
+        config.reload_on_signal()
+        config.reload()
+    finally:
+        signal.signal(signal.SIGHUP, previous)
+
+    assert signalled
+    assert config.settings.SECRET == "new"
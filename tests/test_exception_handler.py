@@ -1,3 +1,5 @@
+import logging
+
 from little_api.exceptions import RouteNotFoundException
 
 from .conftest import BASE_URL
@@ -27,3 +29,89 @@ def test_404_exception_handler(api, client):
     response = client.get(f"{BASE_URL}/unknown")
     assert response.text == "Caught 404"
     assert response.status_code == 413
+
+
+def test_handlers_match_subclasses(api, client):
+    class OutageError(ConnectionError):
+        pass
+
+    def unavailable(req, resp, exc):
+        resp.status_code = 503
+        resp.text = type(exc).__name__
+
+    api.add_exception_handler(OSError, unavailable)
+
+    @api.route("/")
+    def index(req, resp):
+        raise OutageError()
+
+    response = client.get(f"{BASE_URL}/")
+    assert response.status_code == 503
+    assert response.text == "OutageError"
+
+
+def test_closest_handler_wins_and_resolution_is_cached(api, client):
+    def os_error(req, resp, exc):
+        resp.text = "os"
+
+    def connection_error(req, resp, exc):
+        resp.text = "connection"
+
+    api.add_exception_handler(OSError, os_error)
+
+    @api.route("/")
+    def index(req, resp):
+        raise ConnectionRefusedError()
+
+    assert client.get(f"{BASE_URL}/").text == "os"
+    assert api._resolved_handlers[ConnectionRefusedError] == os_error
+
+    # adding a handler drops the resolved ones
+    api.add_exception_handler(ConnectionError, connection_error)
+    assert client.get(f"{BASE_URL}/").text == "connection"
+
+
+def test_same_named_exceptions_dont_collide(api, client):
+    NotFound = type("RouteNotFoundException", (Exception,), {})
+
+    @api.route("/")
+    def index(req, resp):
+        raise NotFound()
+
+    response = api.test_session(raise_server_exceptions=False).get(f"{BASE_URL}/")
+    assert response.status_code == 500
+    assert client.get(f"{BASE_URL}/missing").status_code == 404
+
+
+def test_unhandled_exceptions_return_500(api, caplog):
+    @api.route("/boom")
+    def boom(req, resp):
+        raise KeyError("secret detail")
+
+    client = api.test_session(raise_server_exceptions=False)
+    with caplog.at_level(logging.DEBUG, logger="little_api.api"):
+        responses = [client.get(f"{BASE_URL}/boom") for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [500] * 3
+    assert responses[0].json() == {"error": "Internal Server Error"}
+    assert "secret detail" not in responses[0].text
+    assert api.exception_counts[KeyError] == 3
+    # only the first one formats a traceback
+    assert [record.exc_info is not None for record in caplog.records] == [
+        True,
+        False,
+        False,
+    ]
+
+
+def test_before_request_exceptions_are_handled(api, client):
+    @api.before_request
+    def before_request(req, resp):
+        raise PermissionError("denied")
+
+    def forbidden(req, resp, exc):
+        resp.status_code = 403
+
+    api.add_exception_handler(PermissionError, forbidden)
+    assert client.get(f"{BASE_URL}/anything").status_code == 403
+    assert api.exception_counts == {PermissionError: 1}
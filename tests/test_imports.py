@@ -0,0 +1,53 @@
+import json
+import subprocess
+import sys
+
+# generous, the heavy module checks catch regressions long before this
+COLD_IMPORT_BUDGET_SECONDS = 1.0
+
+HEAVY_MODULES = ["jinja2", "parse", "webob", "whitenoise", "jwt", "requests"]
+
+
+def loaded_modules(code):
+    script = (
+        f"import json, sys\n{code}\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def test_importing_api_is_light():
+    assert loaded_modules("import little_api.api, little_api.auth") == []
+
+
+def test_cold_import_time():
+    script = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        "import little_api.api, little_api.auth\n"
+        "print(time.perf_counter() - start)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, capture_output=True, text=True
+    ).stdout
+    assert float(output.splitlines()[-1]) < COLD_IMPORT_BUDGET_SECONDS
+
+
+def test_subsystems_load_on_first_use(tmp_path):
+    setup = (
+        "from little_api.api import API\n"
+        f"api = API(templates_dir={str(tmp_path)!r}, static_dir={str(tmp_path)!r})\n"
+        "@api.route('/')\n"
+        "def home(req, resp):\n"
+        "    resp.json = {}\n"
+    )
+    assert loaded_modules(setup) == []
+    # a plain JSON request doesn't need templates or static files
+    requested = loaded_modules(setup + "api.test_session().get('/')")
+    assert "jinja2" not in requested
+    assert "whitenoise" not in requested
+    assert "jinja2" in loaded_modules(setup + "api.templates_env")
+    assert "whitenoise" in loaded_modules(setup + "api.test_session().get('/static/x')")
@@ -0,0 +1,140 @@
+import pytest
+
+from little_api.exceptions import MultipartError, RequestEntityTooLarge
+from little_api.multipart import MultipartParser, parse_options_header
+
+from .conftest import BASE_URL
+
+BOUNDARY = "----little-api-boundary"
+
+
+def encode_multipart(fields=(), files=()):
+    lines = []
+    for name, value in fields:
+        lines += [
+            f"--{BOUNDARY}".encode(),
+            f'Content-Disposition: form-data; name="{name}"'.encode(),
+            b"",
+            value.encode(),
+        ]
+    for name, filename, data in files:
+        lines += [
+            f"--{BOUNDARY}".encode(),
+            (
+                f'Content-Disposition: form-data; name="{name}"; '
+                f'filename="{filename}"'
+            ).encode(),
+            b"Content-Type: application/octet-stream",
+            b"",
+            data,
+        ]
+    lines += [f"--{BOUNDARY}--".encode(), b""]
+    return b"\r\n".join(lines)
+
+
+def chunked(data, size):
+    return [data[idx : idx + size] for idx in range(0, len(data), size)]  # noqa
+
+
+def upload(client, path, body):
+    return client.post(
+        f"{BASE_URL}{path}",
+        data=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+    )
+
+
+def test_parse_options_header():
+    assert parse_options_header('form-data; name="a;b"; filename=x.csv') == (
+        "form-data",
+        {"name": "a;b", "filename": "x.csv"},
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+def test_parts_split_across_chunks(chunk_size):
+    data = bytes(range(256)) * 20 + b"\r\n--" + BOUNDARY[:-3].encode()
+    body = encode_multipart(
+        [("name", "John"), ("empty", "")], [("file", "a.bin", data)]
+    )
+    parser = MultipartParser(BOUNDARY, spool_threshold=100)
+
+    parts = list(parser.parse(chunked(body, chunk_size)))
+
+    assert [part.name for part in parts] == ["name", "empty", "file"]
+    assert parts[0].value == "John"
+    assert parts[1].value == ""
+    assert parts[2].filename == "a.bin"
+    assert parts[2].content_type == "application/octet-stream"
+    assert parts[2].size == len(data)
+    assert parts[2].read() == data
+
+
+def test_truncated_body():
+    body = encode_multipart([("name", "John")])
+    with pytest.raises(MultipartError):
+        list(MultipartParser(BOUNDARY).parse([body[:-20]]))
+
+
+def test_part_size_limits():
+    body = encode_multipart(files=[("file", "a.bin", b"x" * 100)])
+    with pytest.raises(RequestEntityTooLarge):
+        list(MultipartParser(BOUNDARY, max_part_size=99).parse(chunked(body, 10)))
+    with pytest.raises(RequestEntityTooLarge):
+        list(MultipartParser(BOUNDARY, max_total_size=100).parse(chunked(body, 10)))
+    assert list(MultipartParser(BOUNDARY, max_part_size=100).parse([body]))
+
+
+def test_upload_to_destination(api, client, tmp_path):
+    destination = tmp_path / "upload.bin"
+    saved = tmp_path / "saved.txt"
+
+    @api.route("/upload")
+    def handler(req, resp):
+        parts = req.multipart(destinations={"file": str(destination)})
+        parts["note"].save(str(saved))
+        resp.json = {
+            "note": parts["note"].value,
+            "path": parts["file"].path,
+            "size": parts["file"].size,
+        }
+
+    body = encode_multipart([("note", "hi")], [("file", "a.bin", b"data" * 1000)])
+    assert upload(client, "/upload", body).json() == {
+        "note": "hi",
+        "path": str(destination),
+        "size": 4000,
+    }
+    assert destination.read_bytes() == b"data" * 1000
+    assert saved.read_text() == "hi"
+
+
+def test_upload_errors(api, client, tmp_path):
+    destination = tmp_path / "upload.bin"
+
+    @api.route("/upload")
+    def handler(req, resp):
+        for part in req.iter_parts(
+            max_part_size=10, destinations={"file": lambda part: str(destination)}
+        ):
+            pass
+
+    too_large = encode_multipart(files=[("file", "a.bin", b"x" * 11)])
+    assert upload(client, "/upload", too_large).status_code == 413
+    # the partially written destination is removed
+    assert not destination.exists()
+    assert upload(client, "/upload", b"garbage").status_code == 400
+    assert client.post(f"{BASE_URL}/upload", data=b"x").status_code == 400
+
+
+def test_streaming_raw_body(api, client, tmp_path):
+    path = tmp_path / "body.csv"
+
+    @api.route("/raw")
+    def handler(req, resp):
+        resp.json = {"size": req.save_body(str(path))}
+
+    data = b"a,b\n" * 50_000
+    response = client.post(f"{BASE_URL}/raw", data=iter(chunked(data, 4096)))
+    assert response.json() == {"size": len(data)}
+    assert path.read_bytes() == data
@@ -1,19 +1,21 @@
-import os
+import inspect
 import sqlite3
+import threading
+from array import array
 from datetime import datetime
 
 import pytest
 
-from little_api.orm import Column, Database, ForeignKey, Table
+from little_api.cache import SQLiteCache
+from little_api.exceptions import StaleInstanceError
+from little_api.orm import Column, Database, ForeignKey, Index, QueryCache, Table
 
 
 @pytest.fixture
-def db(path: str = "./test.db"):
-    # Remove database if exists
-    if os.path.exists(path):
-        os.remove(path)
-    db = Database(path)
+def db(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
     yield db
+    db.close()
 
 
 @pytest.fixture
@@ -173,3 +175,783 @@ def test_db_delete(db, Author):
 
     author = db.get(Author, id=author.id)
     assert not author
+
+
+def test_iter_yields_instances_lazily(db, Author):
+    db.create(Author)
+    for age in range(5):
+        db.save(Author(name="Bob Smith", age=age))
+    db.save(Author(name="Sally Smith", age=30))
+
+    authors = db.iter(Author, batch_size=2, name="Bob Smith")
+    assert inspect.isgenerator(authors)
+    authors = list(authors)
+    assert len(authors) == 5
+    assert all(type(a) == Author for a in authors)
+    assert [a.age for a in authors] == [0, 1, 2, 3, 4]
+
+
+def test_iter_raw(db, Book, Author):
+    db.create(Author)
+    db.create(Book)
+    bob = Author(name="Bob", age=50)
+    db.save(bob)
+    db.save(Book(title="Bob's Book", published=True, author=bob, created_at=None))
+
+    assert list(db.iter_raw(Author)) == [(1, 50, "Bob")]
+    assert list(db.iter_raw(Author, as_dict=True, name="Bob")) == [
+        {"id": 1, "age": 50, "name": "Bob"}
+    ]
+    book = next(db.iter_raw(Book, as_dict=True))
+    assert book["author_id"] == bob.id
+    assert list(db.iter_raw(Author, name="Nobody")) == []
+
+
+@pytest.fixture
+def authors(db, Author):
+    db.create(Author)
+    for name, age in [("Bob", 20), ("Sally", 35), ("Sam", 41), ("Ann_e", 52)]:
+        db.save(Author(name=name, age=age))
+    yield db
+
+
+def test_query_renders_parameterised_sql(db, Author):
+    query = (
+        db.query(Author)
+        .where(age__gte=18, name__in=["Bob", "Sally"])
+        .order_by("-id")
+        .limit(50)
+        .only("id", "name")
+    )
+    assert query.sql() == (
+        "SELECT id, name FROM author WHERE age >= ? AND name IN (?, ?) "
+        "ORDER BY id DESC LIMIT ?;",
+        ["id", "name"],
+        [18, "Bob", "Sally", 50],
+    )
+
+
+def test_query_is_immutable(db, Author):
+    query = db.query(Author)
+    query.where(age=1).limit(1)
+    assert query.sql() == ("SELECT id, age, name FROM author;", query._fields, [])
+
+
+@pytest.mark.parametrize(
+    "filters,names",
+    [
+        ({"age__gt": 35}, ["Sam", "Ann_e"]),
+        ({"age__lte": 35}, ["Bob", "Sally"]),
+        ({"age__range": (30, 45)}, ["Sally", "Sam"]),
+        ({"name__ne": "Bob"}, ["Sally", "Sam", "Ann_e"]),
+        ({"name__in": ["Sam", "Bob"]}, ["Bob", "Sam"]),
+        ({"name__in": []}, []),
+        ({"name__like": "S%"}, ["Sally", "Sam"]),
+        ({"name__startswith": "Sa"}, ["Sally", "Sam"]),
+        ({"name__contains": "_"}, ["Ann_e"]),
+        ({"name__isnull": False}, ["Bob", "Sally", "Sam", "Ann_e"]),
+        ({"name": None}, []),
+    ],
+)
+def test_query_operators(authors, Author, filters, names):
+    assert [a.name for a in authors.query(Author).where(**filters)] == names
+
+
+def test_query_order_limit_offset(authors, Author):
+    query = authors.query(Author).order_by("-age")
+    assert [a.age for a in query.limit(2).all()] == [52, 41]
+    assert [a.age for a in query.limit(2).offset(2).all()] == [35, 20]
+    assert [a.age for a in query.offset(3).all()] == [20]
+    assert query.first().name == "Ann_e"
+    assert authors.query(Author).where(age=0).first() is None
+
+
+def test_query_keyset_pagination(authors, Author):
+    page = authors.query(Author).limit(2).all()
+    assert [a.id for a in page] == [1, 2]
+    page = authors.query(Author).after(page[-1].id).limit(2).all()
+    assert [a.id for a in page] == [3, 4]
+
+    page = authors.query(Author).order_by("-age", "-id").after(41, 3).all()
+    assert [a.name for a in page] == ["Sally", "Bob"]
+
+    with pytest.raises(ValueError):
+        authors.query(Author).order_by("age", "-id").after(1, 1).sql()
+
+
+def test_query_projection(authors, Author):
+    author = authors.query(Author).where(name="Sam").only("id", "name").first()
+    assert author.id == 3
+    assert author.name == "Sam"
+    assert "age" not in author._column_data
+
+    author.name = "Samuel"
+    authors.update(author)
+    assert authors.get(Author, id=3)[0].name == "Samuel"
+
+
+def test_query_projection_without_id_is_read_only(authors, Author):
+    author = authors.query(Author).where(name="Sam").only("name").first()
+    author.name = "Samuel"
+    with pytest.raises(ValueError):
+        authors.update(author)
+    with pytest.raises(ValueError):
+        authors.save(author)
+    assert authors.count(Author, name="Sam") == 1
+
+
+def test_query_foreign_key_filter(db, Book, Author):
+    db.create(Author)
+    db.create(Book)
+    bob, sally = Author(name="Bob", age=50), Author(name="Sally", age=40)
+    db.save(bob)
+    db.save(sally)
+    for title, author in [("One", bob), ("Two", sally), ("Three", bob)]:
+        db.save(Book(title=title, published=True, author=author, created_at=None))
+
+    books = db.query(Book).where(author=bob).order_by("title").all()
+    assert [b.title for b in books] == ["One", "Three"]
+    assert books[0].author.name == "Bob"
+    assert db.query(Book).where(author_id__in=[sally]).first().title == "Two"
+
+
+def test_query_rejects_unknown_columns(db, Author):
+    with pytest.raises(ValueError):
+        db.query(Author).where(nope=1)
+    with pytest.raises(ValueError):
+        db.query(Author).order_by("age; DROP TABLE author")
+    with pytest.raises(ValueError):
+        db.query(Author).where(age__between=1)
+
+
+@pytest.fixture
+def User(Author):
+    class User(Table):
+        user_name = Column(str, unique=True)
+        email = Column(str, index=True)
+        first = Column(str)
+        last = Column(str)
+        author = ForeignKey(Author)
+        by_full_name = Index("last", "first")
+        by_author_email = Index("author", "email", unique=True)
+
+    yield User
+
+
+def test_index_sql(User):
+    assert User.get_index_sql() == [
+        "CREATE INDEX IF NOT EXISTS ix_user_author_id ON user (author_id);",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_user_by_author_email "
+        "ON user (author_id, email);",
+        "CREATE INDEX IF NOT EXISTS ix_user_by_full_name ON user (last, first);",
+        "CREATE INDEX IF NOT EXISTS ix_user_email ON user (email);",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_user_user_name ON user (user_name);",
+    ]
+
+
+def test_create_indexes_idempotently(db, Author, User):
+    db.create(Author)
+    db.create(User)
+    db.create(User)
+
+    indexes = {
+        row[0]
+        for row in db.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'user'"
+        )
+    }
+    assert {"ux_user_user_name", "ix_user_email", "ix_user_by_full_name"} <= indexes
+
+
+def test_unique_column(db, Author, User):
+    db.create(Author)
+    db.create(User)
+    author = Author(name="Bob", age=1)
+    db.save(author)
+    db.save(User(user_name="bob", email="a", first="b", last="c", author=author))
+
+    with pytest.raises(sqlite3.IntegrityError):
+        db.save(User(user_name="bob", email="d", first="e", last="f", author=author))
+
+
+def test_explain_uses_index(db, Author, User):
+    db.create(Author)
+    db.create(User)
+
+    plan = db.explain(db.query(User).where(user_name="bob"))
+    assert any("ux_user_user_name" in detail for detail in plan)
+
+    plan = db.query(User).where(last="Smith", first="Bob").explain()
+    assert any("ix_user_by_full_name" in detail for detail in plan)
+
+    plan = db.explain(User.get_filtered_select(first="Bob")[::2])
+    assert any(detail.startswith("SCAN") for detail in plan)
+
+
+def test_instances_are_slotted(Author, Book):
+    author = Author(name="Bob", age=20)
+    assert not hasattr(author, "__dict__")
+    assert Book.__slots__ == ()
+    assert author._column_data == {"id": None, "name": "Bob", "age": 20}
+
+    author.age = 21
+    assert author.age == 21
+    assert author._column_data["age"] == 21
+    with pytest.raises(AttributeError):
+        author.nickname = "Bobby"
+
+
+def test_unset_columns_are_none(db, Author, Book):
+    db.create(Author)
+    db.create(Book)
+    book = Book(title="Anonymous")
+    assert book.published is None
+    assert book.author is None
+
+    db.save(book)
+    book = db.get(Book, id=book.id)[0]
+    assert book.author is None
+    assert book.created_at is not None
+
+
+def test_from_row(Author):
+    author = Author.from_row(["id", "age", "name"], (3, 20, "Bob"))
+    assert type(author) == Author
+    assert (author.id, author.age, author.name) == (3, 20, "Bob")
+
+
+def test_foreign_keys_resolved_once_per_row(db, Book, Author):
+    db.create(Author)
+    db.create(Book)
+    bob = Author(name="Bob", age=50)
+    db.save(bob)
+    for title in ("One", "Two"):
+        db.save(Book(title=title, author=bob))
+
+    books = db.all(Book)
+    assert books[0].author is books[1].author
+    assert books[0].author.name == "Bob"
+
+
+def test_dirty_tracking(db, Author):
+    db.create(Author)
+    author = Author(name="Bob", age=20)
+    assert author.is_dirty
+    db.save(author)
+    assert not author.is_dirty
+
+    author = db.get(Author, id=author.id)[0]
+    assert not author.is_dirty
+    author.age = 20
+    assert not author.is_dirty
+    author.age = 21
+    assert author.is_dirty
+    assert author.get_update_sql() == (
+        "UPDATE author SET age = ? WHERE id = ?",
+        [21, author.id],
+    )
+    assert author.get_update_sql(fields=["name", "age"]) == (
+        "UPDATE author SET age = ?, name = ? WHERE id = ?",
+        [21, "Bob", author.id],
+    )
+
+
+def test_update_writes_only_changed_columns(db, Author):
+    db.create(Author)
+    author = Author(name="Bob", age=20)
+    db.save(author)
+    stale = db.get(Author, id=author.id)[0]
+
+    author.age = 30
+    db.update(author)
+    stale.name = "Robert"
+    db.update(stale)
+
+    author = db.get(Author, id=author.id)[0]
+    assert (author.name, author.age) == ("Robert", 30)
+
+
+def test_update_skips_clean_instances(db, Author):
+    db.create(Author)
+    author = Author(name="Bob", age=20)
+    db.save(author)
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+
+    db.update(author)
+    assert statements == []
+
+
+def test_update_foreign_key(db, Book, Author):
+    db.create(Author)
+    db.create(Book)
+    bob, sally = Author(name="Bob", age=50), Author(name="Sally", age=40)
+    db.save(bob)
+    db.save(sally)
+    book = Book(title="Book", author=bob)
+    db.save(book)
+
+    book.author = sally
+    assert book.get_update_sql()[0] == "UPDATE book SET author_id = ? WHERE id = ?"
+    db.update(book)
+    assert db.get(Book, id=book.id)[0].author.name == "Sally"
+
+
+def test_optimistic_concurrency(db):
+    class Account(Table):
+        balance = Column(int)
+        version = Column(int, version=True)
+
+    db.create(Account)
+    account = Account(balance=10)
+    db.save(account)
+    assert account.version == 1
+
+    first = db.get(Account, id=account.id)[0]
+    second = db.get(Account, id=account.id)[0]
+    first.balance = 20
+    assert first.get_update_sql() == (
+        "UPDATE account SET balance = ?, version = ? WHERE id = ? AND version = ?",
+        [20, 2, account.id, 1],
+    )
+    db.update(first)
+    assert first.version == 2
+
+    second.balance = 30
+    with pytest.raises(StaleInstanceError):
+        db.update(second)
+    assert db.get(Account, id=account.id)[0].balance == 20
+
+
+@pytest.fixture
+def cached_db(tmp_path):
+    yield Database(str(tmp_path / "cached.db"), cache=QueryCache(maxsize=16))
+
+
+def test_query_cache_hits(cached_db, Author):
+    db = cached_db
+    db.create(Author)
+    db.save(Author(name="Bob", age=20))
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+
+    for _ in range(3):
+        assert db.get(Author, id=1)[0].name == "Bob"
+        assert db.query(Author).where(age__gte=18).first().name == "Bob"
+    assert len(statements) == 2
+    assert (db.cache.hits, db.cache.misses) == (4, 2)
+
+    first, second = db.get(Author, id=1)[0], db.get(Author, id=1)[0]
+    assert first is not second
+
+
+def test_query_cache_invalidated_by_writes(cached_db, Author):
+    db = cached_db
+    db.create(Author)
+    author = Author(name="Bob", age=20)
+    db.save(author)
+    assert len(db.all(Author)) == 1
+
+    db.save_many([Author(name="Sally", age=30), Author(name="Sam", age=40)])
+    assert len(db.all(Author)) == 3
+
+    author.age = 21
+    db.update(author)
+    assert db.get(Author, id=author.id)[0].age == 21
+
+    db.delete(author)
+    assert db.get(Author, id=author.id) == []
+    assert len(db.all(Author)) == 2
+
+
+def test_save_many(db, Author):
+    db.create(Author)
+    authors = [Author(name="Bob", age=20), Author(name="Sally", age=30)]
+    db.save_many(authors)
+    assert [a.id for a in authors] == [1, 2]
+    assert not any(a.is_dirty for a in authors)
+
+    with pytest.raises(sqlite3.Error):
+        db.save_many([Author(name="Sam", age=40), Author(nope=1)])
+    assert len(db.all(Author)) == 2
+
+
+def test_shared_query_cache_syncs_between_connections(tmp_path, Author):
+    path = str(tmp_path / "shared.db")
+    first = Database(path, cache=QueryCache(shared=True))
+    second = Database(path, cache=QueryCache(shared=True))
+    first.create(Author)
+    first.save(Author(name="Bob", age=20))
+    assert len(second.all(Author)) == 1
+
+    first.save(Author(name="Sally", age=30))
+    assert len(second.all(Author)) == 1
+    second.sync_cache()
+    assert len(second.all(Author)) == 2
+
+
+def test_count_and_exists(authors, Author):
+    statements = []
+    authors.conn.set_trace_callback(statements.append)
+
+    assert authors.count(Author) == 4
+    assert authors.count(Author, name="Bob") == 1
+    assert authors.exists(Author, name="Sam")
+    assert not authors.exists(Author, name="Nobody")
+    assert authors.query(Author).where(age__gt=30).count() == 3
+    assert authors.query(Author).order_by("age").limit(2).count() == 2
+    assert statements[0] == "SELECT COUNT(*) FROM author;"
+    assert statements[3] == (
+        "SELECT EXISTS(SELECT 1 FROM author WHERE name = 'Nobody' LIMIT 1);"
+    )
+
+
+def test_scalar_aggregates(authors, Author):
+    assert authors.sum(Author, "age") == 148
+    assert authors.avg(Author, "age") == 37
+    assert authors.min(Author, "age") == 20
+    assert authors.max(Author, "age", name__startswith="S") == 41
+    assert authors.sum(Author, "age", name="Nobody") is None
+    assert authors.query(Author).order_by("-age").limit(2).sum("age") == 93
+
+    with pytest.raises(ValueError):
+        authors.sum(Author, "*")
+
+
+def test_group_by(db, Book, Author):
+    db.create(Author)
+    db.create(Book)
+    bob, sally = Author(name="Bob", age=50), Author(name="Sally", age=40)
+    db.save_many([bob, sally])
+    db.save_many(
+        [
+            Book(title="One", published=True, author=bob),
+            Book(title="Two", published=False, author=sally),
+            Book(title="Three", published=True, author=bob),
+        ]
+    )
+
+    assert db.group_by(Book, "author", books=("count", "*")) == [
+        (bob.id, 2),
+        (sally.id, 1),
+    ]
+    assert db.query(Book).where(published=True).group_by(
+        "author", "published", books=("count", "*"), first=("min", "title")
+    ) == [(bob.id, 1, 2, "One")]
+    assert db.query(Author).order_by("-age").group_by("name", total=("sum", "age")) == [
+        ("Bob", 50),
+        ("Sally", 40),
+    ]
+    # aggregate names that are sql keywords
+    assert db.group_by(
+        Book, "author", order=("count", "*"), group=("max", "title")
+    ) == [
+        (bob.id, 2, "Three"),
+        (sally.id, 1, "Two"),
+    ]
+
+
+def test_result_modes(authors, Author):
+    assert authors.get(Author, mode="tuples", name="Bob") == [(1, 20, "Bob")]
+    assert authors.get(Author, mode="dicts", name="Bob") == [
+        {"id": 1, "age": 20, "name": "Bob"}
+    ]
+    query = authors.query(Author).where(age__lt=40).only("name", "age")
+    assert query.all(mode="columns") == {"name": ["Bob", "Sally"], "age": [20, 35]}
+
+    columns = authors.all(Author, mode="arrays")
+    assert columns["age"] == array("q", [20, 35, 41, 52])
+    assert columns["id"] == array("q", [1, 2, 3, 4])
+    assert columns["name"] == ["Bob", "Sally", "Sam", "Ann_e"]
+
+    assert authors.get(Author, mode="columns", name="Nobody") == {
+        "id": [],
+        "age": [],
+        "name": [],
+    }
+    with pytest.raises(ValueError):
+        authors.all(Author, mode="frames")
+
+
+def test_arrays_mode_falls_back_to_lists_for_nulls(db, Book, Author):
+    db.create(Author)
+    db.create(Book)
+    db.save(Book(title="Anonymous", published=True))
+
+    columns = db.all(Book, mode="arrays")
+    assert columns["author_id"] == [None]
+    assert columns["published"] == array("q", [1])
+
+
+def test_numpy_mode(authors, Author):
+    numpy = pytest.importorskip("numpy")
+
+    columns = authors.all(Author, mode="numpy")
+    assert columns["age"].dtype == numpy.int64
+    assert columns["age"].sum() == 148
+    assert list(columns["name"]) == ["Bob", "Sally", "Sam", "Ann_e"]
+
+
+def test_numpy_mode_keeps_nulls(db, Book, Author):
+    numpy = pytest.importorskip("numpy")
+    db.create(Author)
+    db.create(Book)
+    db.save(Book(title="Draft", published=None))
+    db.save(Book(title="Out", published=True))
+
+    columns = db.all(Book, mode="numpy")
+    assert columns["published"].dtype == numpy.dtype(object)
+    assert list(columns["published"]) == [None, True]
+    assert columns["id"].dtype == numpy.int64
+
+
+@pytest.fixture
+def Post():
+    class Post(Table):
+        title = Column(str, full_text=True)
+        body = Column(str, full_text=True)
+        views = Column(int)
+
+    yield Post
+
+
+def test_full_text_sql(Post, Author):
+    assert Author.get_full_text_sql() == []
+    statements = Post.get_full_text_sql()
+    assert statements[0] == (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5(body, title, "
+        "content='post', content_rowid='id');"
+    )
+    assert len(statements) == 4
+
+
+def test_search_ranks_matches(db, Post):
+    db.create(Post)
+    db.save_many(
+        [
+            Post(title="Cooking with sqlite", body="a recipe", views=1),
+            Post(title="Gardening", body="sqlite sqlite sqlite", views=2),
+            Post(title="Nothing", body="to see here", views=3),
+        ]
+    )
+
+    posts = db.search(Post, "sqlite")
+    assert [p.views for p in posts] == [2, 1]
+    assert type(posts[0]) == Post
+    assert db.search(Post, "sqlite", limit=1)[0].views == 2
+    assert db.search(Post, "title:sqlite", raw=True)[0].views == 1
+    assert db.search(Post, "missing") == []
+
+
+def test_search_takes_plain_text(db, Post):
+    db.create(Post)
+    db.save(Post(title="C++ tips", body='say "hi" to foo-bar', views=1))
+
+    for query in ['say "hi', "foo-bar", "c++", "title:tips", "AND", "   "]:
+        db.search(Post, query)
+    assert db.search(Post, "c++ tips")[0].views == 1
+    assert db.search(Post, 'say "hi')[0].views == 1
+    assert db.search(Post, "foo-bar")[0].views == 1
+    assert db.search(Post, "   ") == []
+
+    for query in ['say "hi', "foo-bar", "c++"]:
+        with pytest.raises(ValueError):
+            db.search(Post, query, raw=True)
+
+
+def test_search_snippets(db, Post):
+    db.create(Post)
+    db.save(Post(title="Hello", body="the quick brown fox jumps", views=1))
+
+    [(post, snippet)] = db.search(Post, "fox", snippet="body", snippet_tokens=3)
+    assert post.title == "Hello"
+    assert snippet == "...brown <b>fox</b> jumps"
+
+    with pytest.raises(ValueError):
+        db.search(Post, "fox", snippet="views")
+
+
+def test_search_index_follows_writes(db, Post):
+    db.create(Post)
+    post = Post(title="Old title", body="", views=1)
+    db.save(post)
+
+    post.title = "New title"
+    db.update(post)
+    assert db.search(Post, "old") == []
+    assert db.search(Post, "new")[0].id == post.id
+
+    db.delete(post)
+    assert db.search(Post, "new") == []
+
+
+def test_search_indexes_existing_rows(db, Author):
+    db.create(Author)
+    db.save(Author(name="Bob Smith", age=20))
+    with pytest.raises(ValueError):
+        db.search(Author, "smith")
+
+    class Searchable:
+        # the same table, now with a full text column
+        class Author(Table):
+            name = Column(str, full_text=True)
+            age = Column(int)
+
+    db.create(Searchable.Author)
+    assert db.search(Searchable.Author, "smith")[0].name == "Bob Smith"
+
+
+def test_create_inside_transaction_does_not_commit(db, Author, Post):
+    db.create(Author)
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.save(Author(name="Bob", age=20))
+            db.create(Post)
+            raise RuntimeError
+
+    assert db.all(Author) == []
+    assert "post_fts" not in db.tables
+
+
+def test_transaction_commits_once(db, Author):
+    db.create(Author)
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    with db.transaction():
+        db.save(Author(name="Bob", age=20))
+        db.save(Author(name="Sally", age=30))
+
+    assert statements.count("COMMIT") == 1
+    assert db.count(Author) == 2
+
+
+def test_transaction_rollback_restores_instances(db, Author):
+    db.create(Author)
+    bob = Author(name="Bob", age=20)
+    db.save(bob)
+    sally = Author(name="Sally", age=30)
+
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.save(sally)
+            bob.age = 21
+            db.update(bob)
+            raise RuntimeError()
+
+    assert sally.id is None
+    assert sally.is_dirty
+    assert bob.age == 21
+    assert bob.is_dirty
+    assert db.count(Author) == 1
+    assert db.get(Author, id=bob.id)[0].age == 20
+
+    db.update(bob)
+    assert db.get(Author, id=bob.id)[0].age == 21
+
+
+def test_reopen_replaces_connection(db, Author):
+    db.create(Author)
+    db.save(Author(name="John", age=43))
+    old_conn = db.conn
+
+    db.reopen()
+
+    assert db.conn is not old_conn
+    with pytest.raises(sqlite3.ProgrammingError):
+        old_conn.execute("SELECT 1")
+    [author] = db.get(Author, id=1)
+    assert author.name == "John"
+    db.close()
+
+
+def test_database_used_from_another_thread(tmp_path, Author):
+    db = Database(str(tmp_path / "threads.db"))
+    db.create(Author)
+    db.save(Author(name="John", age=43))
+    results = []
+
+    def handler():
+        db.save(Author(name="Sally", age=30))
+        results.append((db.conn, [a.name for a in db.all(Author)]))
+
+    thread = threading.Thread(target=handler)
+    thread.start()
+    thread.join()
+
+    [(thread_conn, names)] = results
+    assert thread_conn is not db.conn
+    assert names == ["John", "Sally"]
+    assert db.count(Author) == 2
+    db.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        thread_conn.execute("SELECT 1")
+
+
+def test_query_cache_shared_store(tmp_path, Author):
+    path = str(tmp_path / "shared.db")
+    store = SQLiteCache(str(tmp_path / "cache.db"))
+    first = Database(path, cache=QueryCache(shared=True, store=store))
+    first.create(Author)
+    first.save(Author(name="John", age=43))
+    # a second worker with its own connection and the same store
+    second = Database(path, cache=QueryCache(shared=True, store=store))
+
+    assert [a.name for a in first.all(Author)] == ["John"]
+    assert [a.name for a in second.all(Author)] == ["John"]
+    assert (first.cache.misses, second.cache.hits) == (1, 1)
+
+    second.save(Author(name="Jane", age=40))
+    first.sync_cache()
+    assert len(first.all(Author)) == 2
+    assert first.cache.misses == 2
+
+
+def test_query_cache_store_requires_shared(tmp_path):
+    store = SQLiteCache(str(tmp_path / "cache.db"))
+    with pytest.raises(ValueError):
+        QueryCache(store=store)
+
+
+def test_shared_store_reads_own_writes(tmp_path, Author):
+    path = str(tmp_path / "shared.db")
+    store = SQLiteCache(str(tmp_path / "cache.db"))
+    first = Database(path, cache=QueryCache(shared=True, store=store))
+    first.create(Author)
+    second = Database(path, cache=QueryCache(shared=True, store=store))
+    second.save(Author(name="John", age=43))
+    assert [a.name for a in second.all(Author)] == ["John"]
+
+    # the first connection never synced, its own write must not hit the
+    # rows the second one cached
+    first.save(Author(name="Jane", age=40))
+    assert [a.name for a in first.all(Author)] == ["John", "Jane"]
+
+
+def test_reads_in_transaction_skip_cache(cached_db, Author):
+    cached_db.create(Author)
+    with pytest.raises(RuntimeError):
+        with cached_db.transaction():
+            cached_db.save(Author(name="John", age=43))
+            assert len(cached_db.all(Author)) == 1
+            raise RuntimeError
+    assert cached_db.all(Author) == []
+
+
+def test_shared_cache_after_rollback_and_write_elsewhere(tmp_path, Author):
+    path = str(tmp_path / "shared.db")
+    store = SQLiteCache(str(tmp_path / "cache.db"))
+    first = Database(path, cache=QueryCache(shared=True, store=store))
+    first.create(Author)
+    second = Database(path, cache=QueryCache(shared=True, store=store))
+
+    with pytest.raises(RuntimeError):
+        with first.transaction():
+            first.save(Author(name="rolled back", age=1))
+            raise RuntimeError
+    assert first.all(Author) == []
+
+    # the rolled back write's counter is now taken by a real one
+    second.save(Author(name="real", age=2))
+    first.sync_cache()
+    assert [a.name for a in first.all(Author)] == ["real"]
+    assert [a.name for a in second.all(Author)] == ["real"]
@@ -0,0 +1,85 @@
+import io
+
+import pytest
+
+from little_api.exceptions import RequestEntityTooLarge
+from little_api.request import Request
+from little_api.testing import TestClient
+
+from .conftest import BASE_URL
+
+
+def make_request(url="/", max_body_size=None, **kwargs):
+    environ = TestClient(None).build_environ(kwargs.pop("method", "GET"), url, **kwargs)
+    return Request(environ, max_body_size=max_body_size)
+
+
+def test_request_properties():
+    request = make_request(
+        "/caf%C3%A9/items?tag=a&tag=b&empty=",
+        headers={"X-Custom": "yes", "Cookie": "session=abc; theme=dark"},
+    )
+    assert request.method == "GET"
+    assert request.path == "/caf%C3%A9/items"
+    assert request.path_info == "/café/items"
+    assert request.host == "testserver"
+    assert request.url == "http://testserver/caf%C3%A9/items?tag=a&tag=b&empty="
+    assert request.query == {"tag": "b", "empty": ""}
+    assert request.GET.getall("tag") == ["a", "b"]
+    assert request.headers["x-custom"] == "yes"
+    assert request.headers.get("Authorization") is None
+    assert "X-Custom" in dict(request.headers)
+    assert request.cookies == {"session": "abc", "theme": "dark"}
+
+
+def test_body_is_read_once():
+    request = make_request(method="POST", json={"user_name": "john"})
+    assert request.content_type == "application/json"
+    assert request.json == {"user_name": "john"}
+    assert request.json is request.json
+    # the environ's input stays readable after the body was consumed
+    assert request.webob.json == {"user_name": "john"}
+
+
+def test_form_body():
+    request = make_request(method="POST", data={"name": "john", "age": "43"})
+    assert request.form == {"name": "john", "age": "43"}
+
+
+def test_max_body_size():
+    request = make_request(method="POST", data=b"x" * 11, max_body_size=10)
+    with pytest.raises(RequestEntityTooLarge):
+        request.check_body_size()
+    # nothing was read from the stream
+    assert request.environ["wsgi.input"].tell() == 0
+
+    streamed = make_request(method="POST", data=iter([b"x" * 6] * 2), max_body_size=10)
+    with pytest.raises(RequestEntityTooLarge):
+        streamed.body
+
+    assert make_request(method="POST", data=b"x" * 10, max_body_size=10).body
+
+
+def test_oversized_request_gets_413(api, client):
+    api.config["MAX_BODY_SIZE"] = 4
+
+    @api.route("/upload")
+    def upload(req, resp):
+        resp.text = req.text
+
+    response = client.post(f"{BASE_URL}/upload", data=b"12345")
+    assert response.status_code == 413
+    assert client.post(f"{BASE_URL}/upload", data=b"1234").text == "1234"
+
+
+def test_handlers_get_a_little_api_request(api, client):
+    @api.route("/")
+    def index(req, resp):
+        resp.json = {"is_request": isinstance(req, Request)}
+
+    assert client.get(f"{BASE_URL}/").json() == {"is_request": True}
+
+
+def test_no_content_length_and_unterminated_input_is_empty():
+    request = Request({"REQUEST_METHOD": "POST", "wsgi.input": io.BytesIO(b"data")})
+    assert request.body == b""
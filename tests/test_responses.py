@@ -1,5 +1,10 @@
+import json
+
 import pytest
 
+from little_api.orm import Column, Database, Table
+from little_api.response import Response, iter_json_array
+
 from .conftest import BASE_URL
 
 
@@ -101,3 +106,92 @@ def test_custom_response_header(api, client):
 
     assert response.headers["Content-Type"] == "application/json"
     assert response.headers["Access-Control-Allow-Origin"] == "*"
+
+
+def test_streamed_json_response(api, client):
+    @api.route("/stream")
+    def stream_handler(req, resp):
+        resp.stream_json({"value": i} for i in range(3))
+
+    response = client.get(f"{BASE_URL}/stream")
+
+    assert response.headers["Content-Type"] == "application/json"
+    assert response.json() == [{"value": 0}, {"value": 1}, {"value": 2}]
+
+
+def test_streamed_table_instances(api, client):
+    class Item(Table):
+        name = Column(str)
+        price = Column(int)
+
+    db = Database(":memory:", check_same_thread=False)
+    db.create(Item)
+    db.save_many([Item(name="pen", price=2), Item(name="ink", price=5)])
+
+    @api.route("/items")
+    def items_handler(req, resp):
+        resp.stream_json(db.iter(Item))
+
+    @api.route("/names")
+    def names_handler(req, resp):
+        resp.stream_json(db.iter(Item), default=Item.serializer(fields=["name"]))
+
+    assert client.get(f"{BASE_URL}/items").json() == [
+        {"id": 1, "name": "pen", "price": 2},
+        {"id": 2, "name": "ink", "price": 5},
+    ]
+    assert client.get(f"{BASE_URL}/names").json() == [{"name": "pen"}, {"name": "ink"}]
+
+
+def test_head_closes_stream():
+    closed = []
+
+    def rows():
+        try:
+            yield {"value": 1}
+        finally:
+            closed.append("rows")
+
+    class Chunks:
+        def __iter__(self):
+            return iter([b"a"])
+
+        def close(self):
+            closed.append("chunks")
+
+    # e.g. a handler that already fetched the first row
+    items = rows()
+    next(items)
+    resp = Response()
+    resp.stream_json(items)
+    assert resp({"REQUEST_METHOD": "HEAD"}, lambda *args: None) == []
+    resp = Response()
+    resp.stream = Chunks()
+    assert resp({"REQUEST_METHOD": "HEAD"}, lambda *args: None) == []
+
+    assert closed == ["rows", "chunks"]
+
+
+def test_iter_json_array_chunks():
+    chunks = list(iter_json_array(range(100), chunk_size=10))
+    assert len(chunks) > 1
+    assert json.loads(b"".join(chunks)) == list(range(100))
+    assert b"".join(iter_json_array([])) == b"[]"
+
+
+def test_status_line_and_header_overrides(api, client):
+    @api.route("/teapot", allowed_methods=["get", "head"])
+    def teapot(req, resp):
+        resp.status_code = 418
+        resp.headers["content-type"] = "text/csv"
+        resp.text = "a,b"
+
+    response = client.get(f"{BASE_URL}/teapot")
+    assert response.status_code == 418
+    assert response.reason == "I'm a Teapot"
+    assert response.headers.get_all("Content-Type") == ["text/csv"]
+    assert response.headers["Content-Length"] == "3"
+
+    head = client.head(f"{BASE_URL}/teapot")
+    assert head.headers["Content-Length"] == "3"
+    assert head.content == b""
@@ -0,0 +1,112 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from little_api.orm import Column, Database, ForeignKey, Table
+from little_api.serializers import Serializer
+
+
+class Author(Table):
+    name = Column(str)
+    password = Column(str)
+
+
+class Book(Table):
+    title = Column(str)
+    author = ForeignKey(Author)
+    created_at = Column(datetime)
+
+
+@pytest.fixture
+def db():
+    db = Database(":memory:")
+    db.create(Author)
+    db.create(Book)
+    yield db
+
+
+def test_serialize_instance():
+    serializer = Author.serializer(exclude=["password"])
+    assert isinstance(serializer, Serializer)
+    assert serializer.fields == ["id", "name"]
+    assert serializer(Author(name="Bob", password="x")) == {"id": None, "name": "Bob"}
+
+
+def test_serialize_selected_fields():
+    serializer = Book.serializer(fields=["title", "created_at"])
+    book = Book(title="Book", created_at=datetime(2020, 1, 2, 3, 4))
+    assert serializer(book) == {"title": "Book", "created_at": "2020-01-02T03:04:00"}
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(ValueError):
+        Author.serializer(fields=["nope"])
+    with pytest.raises(ValueError):
+        Author.serializer(exclude=["nope"])
+
+
+def test_foreign_keys(db):
+    bob = Author(name="Bob", password="x")
+    db.save(bob)
+    db.save(Book(title="Book", author=bob, created_at="2020-01-02"))
+    [book] = db.all(Book)
+
+    assert Book.serializer(fields=["title", "author"])(book) == {
+        "title": "Book",
+        "author": bob.id,
+    }
+    nested = Book.serializer(
+        fields=["title", "author"],
+        nested={"author": Author.serializer(exclude=["password"])},
+    )
+    assert nested(book) == {"title": "Book", "author": {"id": bob.id, "name": "Bob"}}
+    assert nested(Book(title="Anonymous")) == {"title": "Anonymous", "author": None}
+    # rows only carry the foreign key's id
+    [row] = db.all(Book, mode="tuples")
+    with pytest.raises(ValueError):
+        nested.from_row(row)
+
+
+def test_rename_fields():
+    serializer = Book.serializer(
+        fields=["title", "created_at"], rename={"created_at": "created"}
+    )
+    book = Book(title="Book", created_at=datetime(2020, 1, 2))
+    assert serializer(book) == {"title": "Book", "created": "2020-01-02T00:00:00"}
+    row = ("Book", "2020-01-02")
+    assert serializer.from_row(row, fields=["title", "created_at"]) == {
+        "title": "Book",
+        "created": "2020-01-02",
+    }
+    with pytest.raises(ValueError):
+        Book.serializer(rename={"nope": "x"})
+
+
+def test_serialize_rows(db):
+    bob = Author(name="Bob", password="x")
+    db.save(bob)
+    db.save(Book(title="Book", author=bob, created_at="2020-01-02"))
+    serializer = Book.serializer()
+
+    [row] = db.all(Book, mode="tuples")
+    assert serializer.from_row(row) == {
+        "id": 1,
+        "author": bob.id,
+        "created_at": "2020-01-02",
+        "title": "Book",
+    }
+    rows = db.query(Book).only("title", "id").all(mode="tuples")
+    to_dict = Book.serializer(fields=["id", "title"]).row_serializer(["title", "id"])
+    assert [to_dict(row) for row in rows] == [{"id": 1, "title": "Book"}]
+
+    with pytest.raises(ValueError):
+        serializer.from_row(("Book",), fields=["title"])
+
+
+def test_dumps(db):
+    serializer = Author.serializer(fields=["name"])
+    authors = [Author(name="Bob"), Author(name="Sally")]
+    assert json.loads(serializer.dumps(authors)) == [{"name": "Bob"}, {"name": "Sally"}]
+    assert serializer.dumps(authors[0]) == b'{"name": "Bob"}'
+    assert serializer.many(iter(authors)) == [{"name": "Bob"}, {"name": "Sally"}]
@@ -0,0 +1,121 @@
+import sys
+import types
+
+import pytest
+
+from little_api.api import API
+from little_api.server import (
+    Server,
+    build_parser,
+    load_app,
+    on_reload,
+    post_fork,
+    post_request,
+    post_worker_init,
+    worker_exit,
+)
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    module = types.ModuleType("served_app")
+    module.app = API()
+    module.other = API()
+    monkeypatch.setitem(sys.modules, "served_app", module)
+    return module
+
+
+def test_load_app(app_module):
+    assert load_app("served_app") is app_module.app
+    assert load_app("served_app:other") is app_module.other
+    with pytest.raises(ImportError):
+        load_app("served_app:missing")
+
+
+def test_lifecycle_hooks(api):
+    calls = []
+    api.on_startup(lambda: calls.append("startup"))
+    api.on_worker_init(lambda: calls.append("worker_init"))
+    api.on_shutdown(lambda: calls.append("shutdown"))
+
+    api.startup()
+    api.worker_init()
+    api.shutdown()
+    assert calls == ["startup", "worker_init", "shutdown"]
+
+
+def test_warmup_compiles_routes_and_templates(api):
+    @api.route("/user/{user_id:d}")
+    def user(req, resp, user_id):
+        pass
+
+    api.warmup()
+    assert "parser" in api.routes["/user/{user_id:d}"]
+    assert len(api.templates_env.cache) == len(api.templates_env.list_templates())
+
+
+def test_options_are_passed_to_gunicorn():
+    args = build_parser().parse_args(
+        ["serve", "served_app:app", "-w", "3", "--threads", "2", "--preload"]
+    )
+    server = Server(
+        args.app,
+        {"workers": args.workers, "threads": args.threads, "preload_app": args.preload},
+    )
+    assert server.cfg.workers == 3
+    assert server.cfg.threads == 2
+    assert server.cfg.preload_app
+
+
+def test_worker_hooks(app_module):
+    calls = []
+    app_module.app.on_startup(lambda: calls.append("startup"))
+    app_module.app.on_worker_init(lambda: calls.append("worker_init"))
+    app_module.app.on_shutdown(lambda: calls.append("shutdown"))
+
+    # preloaded, the master loads the app and each forked worker inits it
+    server = Server("served_app", {"preload_app": True})
+    worker = types.SimpleNamespace(app=server, cfg=server.cfg, wsgi=server.wsgi())
+    post_fork(types.SimpleNamespace(app=server), worker)
+    post_worker_init(worker)
+    worker_exit(None, worker)
+    assert calls == ["startup", "worker_init", "shutdown"]
+
+
+def test_worker_hooks_without_preload(app_module):
+    calls = []
+    app_module.app.on_worker_init(lambda: calls.append("worker_init"))
+
+    server = Server("served_app")
+    worker = types.SimpleNamespace(app=server, cfg=server.cfg, wsgi=None)
+    post_fork(types.SimpleNamespace(app=server), worker)
+    assert calls == []
+    # the worker loads the app itself after forking
+    worker.wsgi = server.wsgi()
+    post_worker_init(worker)
+    assert calls == ["worker_init"]
+
+
+def test_workers_restart_past_max_memory(app_module):
+    log = types.SimpleNamespace(info=lambda *args: None)
+    worker = types.SimpleNamespace(
+        app=Server("served_app", max_memory=1), alive=True, pid=1, log=log
+    )
+    post_request(worker, None, {}, None)
+    assert worker.alive is False
+
+    worker = types.SimpleNamespace(app=Server("served_app"), alive=True)
+    post_request(worker, None, {}, None)
+    assert worker.alive is True
+
+
+def test_sighup_reloads_preloaded_config(app_module, tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text('{"SECRET": "old"}')
+    app_module.app.config.load_file(str(path))
+    server = Server("served_app", {"preload_app": True})
+    server.wsgi()
+
+    path.write_text('{"SECRET": "new"}')
+    on_reload(types.SimpleNamespace(app=server))
+    assert app_module.app.config.settings.SECRET == "new"
@@ -0,0 +1,109 @@
+import pytest
+
+from little_api.testing import TestClient
+
+
+def test_absolute_and_relative_urls(api, client):
+    @api.route("/hello")
+    def hello(req, resp):
+        resp.json = {"host": req.host, "query": dict(req.GET)}
+
+    assert client.get("/hello", params={"a": "1"}).json() == {
+        "host": "testserver",
+        "query": {"a": "1"},
+    }
+    response = client.get("http://testserver/hello?b=2")
+    assert response.status_code == 200
+    assert response.json()["query"] == {"b": "2"}
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_request_bodies(api, client):
+    @api.route("/echo")
+    def echo(req, resp):
+        resp.text = f"{req.content_type} {req.body.decode()}"
+
+    assert client.post("/echo", json={"a": 1}).text == 'application/json {"a": 1}'
+    assert client.post("/echo", data={"a": "1"}).text == (
+        "application/x-www-form-urlencoded a=1"
+    )
+    streamed = client.post(
+        "/echo", data=iter([b"ab", b"cd"]), headers={"Content-Type": "text/plain"}
+    )
+    assert streamed.text == "text/plain abcd"
+
+
+def test_cookies_are_kept(api, client):
+    @api.route("/login")
+    def login(req, resp):
+        resp.headers["Set-Cookie"] = "session=abc; Path=/"
+
+    @api.route("/me")
+    def me(req, resp):
+        resp.text = req.cookies.get("session", "anonymous")
+
+    assert client.get("/me").text == "anonymous"
+    assert client.get("/login").cookies == {"session": "abc"}
+    assert client.get("/me").text == "abc"
+    assert client.get("/me", cookies={"session": "xyz"}).text == "xyz"
+
+
+def test_streamed_response_closes_app_iter(api, client):
+    closed = []
+
+    @api.route("/items")
+    def items(req, resp):
+        resp.stream_json(range(3))
+        resp.add_background_task(closed.append, True)
+
+    response = client.get("/items", stream=True)
+    assert b"".join(response.iter_content()) == b"[0,1,2]"
+    api.shutdown()
+    assert closed == [True]
+
+
+def test_exceptions_propagate(api, client):
+    @api.route("/boom")
+    def boom(req, resp):
+        raise KeyError("boom")
+
+    with pytest.raises(KeyError):
+        client.get("/boom")
+
+
+def test_plain_wsgi_app():
+    def app(environ, start_response):
+        start_response("201 Created", [("X-Path", environ["PATH_INFO"])])
+        return [b"done"]
+
+    response = TestClient(app).get("/a%20b")
+    assert response.status_code == 201
+    assert response.headers["x-path"] == "/a b"
+    assert response.content == b"done"
+
+
+def test_iter_content_chunk_size():
+    def app(environ, start_response):
+        start_response("200 OK", [])
+        return [b"abc", b"defgh", b"ij"]
+
+    client = TestClient(app)
+    response = client.get("/", stream=True)
+    assert list(response.iter_content(chunk_size=4)) == [b"abcd", b"efgh", b"ij"]
+    response = client.get("/")
+    assert list(response.iter_content(chunk_size=6)) == [b"abcdef", b"ghij"]
+
+
+def test_app_must_start_response():
+    closed = []
+
+    class Body(list):
+        def close(self):
+            closed.append(True)
+
+    def app(environ, start_response):
+        return Body([b"never started"])
+
+    with pytest.raises(RuntimeError):
+        TestClient(app).get("/")
+    assert closed == [True]